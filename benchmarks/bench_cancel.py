@@ -0,0 +1,53 @@
+"""Compare exception based cancel/defer with STOP and phase='post'
+
+Run from the repository root with ``python -m benchmarks.bench_cancel``.
+"""
+import timeit
+
+from dispatch import STOP, Emitter
+
+NUMBER = 100000
+
+
+def cancel_by_exception(evt):
+    evt.cancel()
+
+
+def cancel_by_return(evt):
+    return STOP
+
+
+def deferred(evt):
+    evt.defer()
+
+
+def noop(evt):
+    pass
+
+
+def build(*handlers):
+    emitter = Emitter()
+    for handler, phase in handlers:
+        emitter.on('bench', handler, phase=phase)
+    return emitter
+
+
+CASES = [
+    ('cancel: evt.cancel()', build((cancel_by_exception, 'main'),
+                                   (noop, 'main'))),
+    ('cancel: return STOP', build((cancel_by_return, 'main'),
+                                  (noop, 'main'))),
+    ("defer: evt.defer()", build((deferred, 'main'), (noop, 'main'))),
+    ("defer: phase='post'", build((noop, 'post'), (noop, 'main'))),
+]
+
+
+def main():
+    for name, emitter in CASES:
+        seconds = min(timeit.repeat(lambda: emitter.fire('bench'),
+                                    number=NUMBER, repeat=3))
+        print('{0:<24}{1:>12,.0f} fires/s'.format(name, NUMBER / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Time Promise.all and Promise.any over growing numbers of promises
+
+Run from the repository root with ``python -m benchmarks.bench_promise``.
+"""
+import time
+
+from dispatch import Promise
+
+SIZES = (1000, 10000, 100000)
+
+
+def run(combinator, complete, size):
+    """Combine size promises and complete them all, returning seconds
+
+    Promises complete in reverse order, the worst case for a combinator
+    that searches for each completed promise.
+    """
+    promises = [Promise() for i in range(size)]
+    start = time.time()
+    combinator(*promises)
+    for promise in reversed(promises):
+        complete(promise)
+    return time.time() - start
+
+
+def main():
+    # all waits for every success, any waits for every failure
+    cases = (('all', Promise.all, Promise.done),
+             ('any', Promise.any, Promise.fail))
+    for name, combinator, complete in cases:
+        for size in SIZES:
+            seconds = run(combinator, complete, size)
+            print('Promise.{0:<4}{1:>8,} promises {2:>10.3f} s'.format(
+                name, size, seconds))
+
+
+if __name__ == '__main__':
+    main()
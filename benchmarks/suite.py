@@ -0,0 +1,255 @@
+"""Benchmark suite of the dispatch hot paths
+
+Run from the repository root with ``python -m benchmarks``. Each case
+reports operations per second and allocations per operation. Measures
+are saved with ``--save FILE`` and checked against with ``--compare FILE``,
+which flags cases that got slower or allocate more and then exits with
+status 1.
+
+Allocations are the bytes traced by tracemalloc for one operation. They
+are reported as n/a and not compared where tracemalloc is not available,
+as on Python 2: there is no way to count the objects an operation
+allocates and frees there.
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+
+from benchmarks.bench_cancel import cancel_by_exception, cancel_by_return, \
+    deferred, noop
+from dispatch import Emitter, FastPromise, Promise
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+ALLOC_UNIT = 'B' if tracemalloc is not None else None
+MIN_TIME = 0.2
+REPEAT = 3
+
+
+def fire_case(count):
+    emitter = Emitter()
+    for i in range(count):
+        emitter.on('bench', noop)
+    return lambda: emitter.fire('bench')
+
+
+def on_off_case():
+    emitter = Emitter()
+    emitter.on('bench', noop)
+
+    def run():
+        emitter.on('bench', cancel_by_return)
+        emitter.off('bench', cancel_by_return)
+    return run
+
+
+def subscription_case():
+    emitter = Emitter()
+    emitter.on('bench', noop)
+    return lambda: emitter.on('bench', cancel_by_return).cancel()
+
+
+def once_case():
+    emitter = Emitter()
+
+    def run():
+        emitter.once('bench', noop)
+        emitter.fire('bench')
+    return run
+
+
+def dispatch_case(*handlers):
+    emitter = Emitter()
+    for handler, phase in handlers:
+        emitter.on('bench', handler, phase=phase)
+    return lambda: emitter.fire('bench')
+
+
+def done_case(cls):
+    def run():
+        promise = cls()
+        promise.success(noop)
+        promise.done(True)
+    return run
+
+
+def combinator_case(combinator, complete, cls, size):
+    def run():
+        promises = [cls() for i in range(size)]
+        combinator(*promises)
+        for promise in reversed(promises):
+            complete(promise)
+    return run
+
+
+def cases():
+    """Yield the name and setup function of each case
+
+    Setup functions return the operation to measure, so that only the
+    selected cases are built.
+    """
+    for count in (0, 1, 10, 1000):
+        yield 'fire/{0}'.format(count), lambda count=count: fire_case(count)
+    yield 'churn/on+off', on_off_case
+    yield 'churn/subscription.cancel', subscription_case
+    yield 'churn/once+fire', once_case
+    yield 'cancel/evt.cancel', lambda: dispatch_case(
+        (cancel_by_exception, 'main'), (noop, 'main'))
+    yield 'cancel/STOP', lambda: dispatch_case(
+        (cancel_by_return, 'main'), (noop, 'main'))
+    yield 'defer/evt.defer', lambda: dispatch_case(
+        (deferred, 'main'), (noop, 'main'))
+    yield 'defer/phase=post', lambda: dispatch_case(
+        (noop, 'post'), (noop, 'main'))
+    for cls in (Promise, FastPromise):
+        yield '{0}.done'.format(cls.__name__), lambda cls=cls: done_case(cls)
+    for cls in (Promise, FastPromise):
+        for size in (10, 1000, 10000):
+            # all waits for every success, any waits for every failure
+            yield '{0}.all/{1}'.format(cls.__name__, size), \
+                lambda cls=cls, size=size: combinator_case(
+                    cls.all, cls.done, cls, size)
+            yield '{0}.any/{1}'.format(cls.__name__, size), \
+                lambda cls=cls, size=size: combinator_case(
+                    cls.any, cls.fail, cls, size)
+
+
+def ops_per_second(operation):
+    """Best rate of operation over REPEAT runs of at least MIN_TIME"""
+    number = 1
+    seconds = timed(operation, number)
+    while seconds < MIN_TIME:
+        number = int(number * min(10, 1.2 * MIN_TIME / max(seconds, 1e-6)))
+        seconds = timed(operation, number)
+    best = seconds
+    for i in range(REPEAT - 1):
+        best = min(best, timed(operation, number))
+    return number / best
+
+
+def timed(operation, number):
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.time()
+        for i in xrange(number):
+            operation()
+        return time.time() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def allocations(operation, number=100):
+    """Bytes allocated by one operation, None if they cannot be measured"""
+    if tracemalloc is None:
+        return None
+    operation()
+    peaks = []
+    for i in range(number):
+        tracemalloc.start()
+        operation()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return float(min(peaks))
+
+
+def measure(selected=None):
+    """Run the cases whose name contains selected
+
+    Yields
+    ------
+    name : str
+    result : dict
+        The 'ops' per second and 'allocs' per operation of the case.
+        'allocs' is None if they cannot be measured
+    """
+    for name, setup in cases():
+        if selected is not None and selected not in name:
+            continue
+        operation = setup()
+        ops = ops_per_second(operation)
+        # Spend about as long counting allocations as timing a run
+        number = max(1, min(100, int(ops * MIN_TIME)))
+        yield name, {'ops': ops, 'allocs': allocations(operation, number)}
+
+
+def compare(result, baseline, threshold, allocs=True):
+    """Describe how result regressed from baseline, if it did
+
+    Returns
+    -------
+    regressions : list of str
+    """
+    regressions = []
+    if result['ops'] < baseline['ops'] * (1 - threshold):
+        regressions.append('{0:.0%} slower'.format(
+            1 - result['ops'] / baseline['ops']))
+    if allocs and result['allocs'] is not None and \
+            baseline['allocs'] is not None and \
+            result['allocs'] > baseline['allocs'] * (1 + threshold) + 1:
+        regressions.append('{0:+.1f} {1} allocated'.format(
+            result['allocs'] - baseline['allocs'], ALLOC_UNIT))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Benchmark the dispatch hot paths')
+    parser.add_argument('--save', metavar='FILE',
+                        help='save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='flag regressions from a saved baseline')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='tolerated slowdown ratio (default: 0.1)')
+    parser.add_argument('--filter', metavar='TEXT',
+                        help='only run cases whose name contains TEXT')
+    args = parser.parse_args(argv)
+    baseline = {}
+    same_allocs = True
+    if args.compare:
+        with open(args.compare) as handle:
+            saved = json.load(handle)
+        baseline = saved['results']
+        # Only bytes measured on both sides compare
+        same_allocs = ALLOC_UNIT is not None and \
+            saved['allocs'] == ALLOC_UNIT
+    results = {}
+    failed = 0
+    print('{0:<28}{1:>14}{2:>14}'.format('case', 'ops/s',
+                                         (ALLOC_UNIT or 'allocs') + '/op'))
+    for name, result in measure(args.filter):
+        results[name] = result
+        if result['allocs'] is None:
+            allocs = 'n/a'
+        else:
+            allocs = '{0:,.1f}'.format(result['allocs'])
+        line = '{0:<28}{1:>14,.0f}{2:>14}'.format(name, result['ops'],
+                                                   allocs)
+        if name in baseline:
+            regressions = compare(result, baseline[name], args.threshold,
+                                  same_allocs)
+            if regressions:
+                failed += 1
+                line += '  REGRESSION: ' + ', '.join(regressions)
+            else:
+                line += '  {0:+.0%}'.format(
+                    result['ops'] / baseline[name]['ops'] - 1)
+        print(line)
+        sys.stdout.flush()
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump({'python': sys.version.split()[0],
+                       'allocs': ALLOC_UNIT,
+                       'results': results}, handle, indent=2,
+                      sort_keys=True)
+    if failed:
+        print('{0} case(s) regressed'.format(failed))
+        return 1
+    return 0
@@ -2,4 +2,8 @@
 from dispatch.events import *
 from dispatch.async import *
 
-__all__ = ['Emitter', 'EventData', 'Promise']
+__all__ = ['STOP', 'BatchHandler', 'BatchResult', 'Emitter', 'EventData',
+           'EventQueue', 'EventQueueFull', 'FastPromise', 'Profiler',
+           'Promise', 'PromiseCancelled', 'PromiseFailed', 'PromiseTimeout',
+           'Stream', 'StreamClosed', 'Subscription', 'ThreadSafeEmitter',
+           'TimerWheel', 'lazy', 'listen', 'transient']
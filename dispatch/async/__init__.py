@@ -1,4 +1,6 @@
 
-from promise import Promise
+from promise import FastPromise, Promise, PromiseCancelled, PromiseFailed, \
+    PromiseTimeout
 
-__all__ = ['Promise']
+__all__ = ['FastPromise', 'Promise', 'PromiseCancelled', 'PromiseFailed',
+           'PromiseTimeout']
@@ -1,47 +1,306 @@
 
-from dispatch.events import Emitter
+from collections import deque
+import functools
+import sys
+import threading
+
+from dispatch.events import Emitter, EventData
+from dispatch.events.aio import require_asyncio
+from dispatch.events.timer import default_wheel
+
+# Per thread queue of chain steps, see _trampoline
+_local = threading.local()
+
+
+def _trampoline(step, *args):
+    """Run step(*args) without growing the stack of an outer step
+
+    The first call on a thread runs the queue until it is empty. Calls made
+    while it runs, such as a then step completing the next promise of a
+    chain, only queue their step, so chains of any length run in a loop.
+
+    If steps raise, the queue is still run to the end, so that the steps
+    of other chains do not wait for an unrelated later call. The first
+    exception is raised then.
+    """
+    try:
+        queue = _local.queue
+    except AttributeError:
+        queue = _local.queue = deque()
+    queue.append((step, args))
+    if getattr(_local, 'running', False):
+        return
+    _local.running = True
+    error = None
+    try:
+        while queue:
+            step, args = queue.popleft()
+            try:
+                step(*args)
+            except Exception:
+                if error is None:
+                    error = sys.exc_info()
+    finally:
+        _local.running = False
+        # Only left over if interrupted, never run them out of context
+        queue.clear()
+    if error is not None:
+        raise error[0], error[1], error[2]
+
+
+class PromiseFailed(Exception):
+    """Raised when awaiting a promise that failed without an error
+
+    Attributes
+    ----------
+    data : object
+        Data the promise failed with
+    """
+    def __init__(self, data=None):
+        Exception.__init__(self, data)
+        self.data = data
+
+
+class PromiseCancelled(Exception):
+    """Error a promise is thrown when it is cancelled"""
+
+
+class PromiseTimeout(Exception):
+    """Error a promise is thrown when it times out
+
+    Attributes
+    ----------
+    seconds : float
+        Timeout that expired
+    """
+    def __init__(self, seconds):
+        Exception.__init__(self, seconds)
+        self.seconds = seconds
+
+
+class _BasePromise(object):
+    """Methods shared by Promise and FastPromise
+
+    They rely on the done, complete and outcome attributes (finished,
+    succeeded, value and exception) of the subclasses.
+    """
+    __slots__ = ()
+
+    def future(self, loop=None):
+        """Get an asyncio Future settled along with this promise
+
+        The future resolves to the promise data on success. It raises the
+        promise error on failure, or PromiseFailed if there is none.
 
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop, optional
+            Loop of the future. Defaults to the current event loop
 
-class Promise(Emitter):
-    finished = False
+        Returns
+        -------
+        future : asyncio.Future
 
-    def done(self, data=None, success=True, err=None):
-        """Indicate that this promise is complete
+        Raises
+        ------
+        RuntimeError
+            If asyncio is not available
 
-        This will now trigger its completion functions
+        Examples
+        --------
+        This is how coroutines wait for a promise, which is not awaitable
+        itself. With trollius:
+
+        >>> @trollius.coroutine
+            def fetch_all(urls):
+                pages = yield From(Promise.all(*map(fetch, urls)).future())
+        """
+        asyncio = require_asyncio()
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        future = asyncio.Future(loop=loop)
+        if self.finished:
+            self._settle(future)
+        else:
+            # The promise may be completed from another thread
+            self.complete(lambda evt: loop.call_soon_threadsafe(self._settle,
+                                                                future))
+        return future
+
+    def _settle(self, future):
+        if future.cancelled():
+            return
+        if self.succeeded:
+            future.set_result(self.value)
+        elif self.exception is not None:
+            future.set_exception(self.exception)
+        else:
+            future.set_exception(PromiseFailed(self.value))
+
+    def then(self, on_success=None, on_failure=None):
+        """Chain a new promise completed from the result of a callback
 
         Parameters
         ----------
-        data : object, optional
-            Object passed into each callbacks EventData.data
-        success : Bool, optional
-            If successful (default), run the success callbacks. Else, the
-            failure callbacks.
-        err : Error
-            If set, call the error callback. Generally failure callbacks
-            get called with this
+        on_success : func(data), optional
+            Called with the data of this promise if it succeeds
+        on_failure : func(data), optional
+            Called with the error of this promise, or its data if it has
+            no error, if it fails
+
+        Returns
+        -------
+        promise : Promise
+            Completed with the return value of the callback that ran. If
+            it returns a promise, this completes along with it instead. It
+            fails with any exception the callback raises. Without a
+            callback for the outcome, it completes like this promise
+
+        Examples
+        --------
+        >>> fetch(url).then(parse).then(store, log_error)
+
+        Notes
+        -----
+        Steps run from a per-thread queue rather than from the callbacks of
+        the previous promise, so chains of any length do not grow the stack.
         """
-        if success:
-            self.fire('success', data=data, cancellable=False)
+        promise = type(self)()
+        step = _Then(promise, on_success, on_failure)
+        if self.finished:
+            _trampoline(step.run, self)
         else:
-            self.fire('failure', data=data, cancellable=False)
-        if err is not None:
-            self.fire('error', data=err, cancellable=False)
-        self.fire('complete', data=data, cancellable=False)
-        self.all_off()
-        self.finished = True
+            self.complete(step)
+        return promise
+
+    def timeout(self, seconds, wheel=None):
+        """Throw PromiseTimeout if this is not done within seconds
 
-    def on(self, event, callback=None):
-        """Hook a callback to an event
+        The deadline is cancelled as soon as this promise completes.
 
-        See Also
+        Parameters
+        ----------
+        seconds : float
+            Time this promise has to complete
+        wheel : TimerWheel, optional
+            Wheel to schedule the deadline on. Defaults to a shared wheel
+            advanced by a daemon thread, whose callbacks, including the
+            error callbacks of timed out promises, run on that thread
+
+        Returns
+        -------
+        promise : Promise
+            This promise
+
+        Examples
         --------
-        Emitter.on
+        >>> fetch(url).timeout(30).then(parse, log_error)
         """
-        # Do not allow hooking after completion
         if self.finished:
-            raise RuntimeError('Promise has already completed')
-        return super(Promise, self).on(event, callback)
+            return self
+        if wheel is None:
+            wheel = default_wheel()
+        timer = wheel.schedule(seconds, self._expire, seconds)
+        self.complete(lambda evt: timer.cancel())
+        return self
+
+    def _expire(self, seconds):
+        self.throw(PromiseTimeout(seconds))
+
+    def progress(self, callback=None, interval=None, wheel=None):
+        """Add a callback for the progress values passed to notify
+
+        Parameters
+        ----------
+        callback : function(EventData)
+            Callback to call with the value as data. If not set, this will
+            be a decorator.
+        interval : float, optional
+            If set, call back at most once every interval seconds. Values
+            notified in between are coalesced: only the latest is passed,
+            once the interval is over. The latest one is also passed when
+            this promise completes, before its other callbacks
+        wheel : TimerWheel, optional
+            Wheel to schedule coalesced calls on. Defaults to the shared
+            wheel of timeout, so these calls run on its thread
+
+        Returns
+        -------
+        callback : function(EventData)
+
+        Notes
+        -----
+        Callbacks added once this promise is done are never called.
+        """
+        if callback is None:
+            return functools.partial(self.progress, interval=interval,
+                                     wheel=wheel)
+        if self.finished:
+            return callback
+        handler = callback
+        if interval is not None:
+            handler = _Throttle(self, callback, interval,
+                                default_wheel() if wheel is None else wheel)
+        if self._progress is None:
+            self._progress = [handler]
+        else:
+            self._progress.append(handler)
+        return callback
+
+    def notify(self, value=None):
+        """Report progress to the progress callbacks
+
+        An EventData is only created for callbacks that are called now,
+        not for values coalesced by a throttled callback.
+
+        Parameters
+        ----------
+        value : object, optional
+            Progress passed as the data of the event
+        """
+        handlers = self._progress
+        if handlers is None:
+            return
+        evt = None
+        error = None
+        for handler in handlers:
+            try:
+                if type(handler) is _Throttle:
+                    handler.offer(value)
+                    continue
+                if evt is None:
+                    evt = EventData('progress', self, value, False)
+                handler(evt)
+            except Exception:
+                if error is None:
+                    error = sys.exc_info()
+        if error is not None:
+            raise error[0], error[1], error[2]
+
+    def _end_progress(self):
+        """Drop the progress callbacks, passing the coalesced values on
+
+        Returns
+        -------
+        errors : list or None
+            sys.exc_info() of the errors raised, if any
+        """
+        handlers = self._progress
+        self._progress = None
+        errors = None
+        for handler in handlers:
+            if type(handler) is _Throttle:
+                try:
+                    handler.flush(True)
+                except Exception:
+                    if errors is None:
+                        errors = []
+                    errors.append(sys.exc_info())
+        return errors
+
+    def _adopt(self, source):
+        """Complete like the completed promise source"""
+        self.done(source.value, source.succeeded, source.exception)
 
     def throw(self, err):
         """Throw an exception and call off the success
@@ -64,6 +323,185 @@ class Promise(Emitter):
         """
         self.done(data, success=False)
 
+    def cancel(self):
+        """Tell the producer of this promise to stop and throw
+        PromiseCancelled
+
+        The 'cancel' callbacks run first, then 'failure', 'error' and
+        'complete' as for throw. Errors of the 'cancel' callbacks are
+        raised once the promise is done.
+
+        Returns
+        -------
+        cancelled : bool
+            False if this promise was already done
+        """
+        if self.finished or self.cancelled:
+            return False
+        self.cancelled = True
+        errors = self._fire_cancel()
+        self.throw(PromiseCancelled())
+        if errors:
+            raise errors[0][1], None, errors[0][2]
+        return True
+
+    @classmethod
+    def all(cls, *promises, **kwargs):
+        """Create a new promise that acts on the completion of all
+        passed promises.
+
+        'success' is fired with the list of their data, in the order the
+        promises were passed, if all promises are successful. 'fail' is
+        fired with the data of the first one to fail as soon as it fails.
+        'error' is thrown if throw_error is True and any of them error.
+
+        Each passed promise costs one small handler and one result slot, and
+        completing it takes constant time.
+
+        Parameters
+        ----------
+        promise_1 ... promise_n : Promise or FastPromise
+            Promises to wait for
+        throw_error : Bool, optional
+            If False (default), this will continue until all promises are
+            complete before throwing its failure. Else throw immediately.
+        cancel_losers : Bool, optional
+            If True, cancel the unfinished promises when one fails, and
+            when the new promise is cancelled. Defaults to False
+
+        Returns
+        -------
+        promise : Promise or FastPromise
+            The new promise, of the class this is called on. Its
+            waiting_for attribute lists the passed promises until it
+            completes, and is None after
+        """
+        return _Combinator(cls(), promises, False,
+                           kwargs.get('throw_error', False),
+                           kwargs.get('cancel_losers', False)).promise
+
+    @classmethod
+    def any(cls, *promises, **kwargs):
+        """Create a new promise that acts on the success of any of the
+        passed promises.
+
+        'success' is fired with the data of the first promise to succeed.
+        'fail' is fired with the list of their data, in the order the
+        promises were passed, if all of them fail. 'error' is thrown if
+        throw_error is True and any of them error.
+
+        Parameters
+        ----------
+        promise_1 ... promise_n : Promise or FastPromise
+            Promises to wait for
+        throw_error : Bool, optional
+            If False (default), this will continue until any promises are
+            complete before throwing its failure. Else throw immediately.
+        cancel_losers : Bool, optional
+            If True, cancel the unfinished promises when one succeeds, and
+            when the new promise is cancelled. Defaults to False
+
+        Returns
+        -------
+        promise : Promise or FastPromise
+            The new promise, of the class this is called on. Its
+            waiting_for attribute lists the passed promises until it
+            completes, and is None after
+        """
+        return _Combinator(cls(), promises, True,
+                           kwargs.get('throw_error', False),
+                           kwargs.get('cancel_losers', False)).promise
+
+    @classmethod
+    def race(cls, *promises):
+        """Create a new promise that completes like the first of the
+        passed promises to complete, and cancel the others
+
+        Parameters
+        ----------
+        promise_1 ... promise_n : Promise or FastPromise
+            Promises to wait for
+
+        Returns
+        -------
+        promise : Promise or FastPromise
+            The new promise, of the class this is called on. Its
+            waiting_for attribute lists the passed promises until it
+            completes. Cancelling it cancels them
+
+        Examples
+        --------
+        >>> Promise.race(fetch(primary), fetch(replica)).then(parse)
+        """
+        return _Combinator(cls(), promises, None, False, True).promise
+
+
+class Promise(Emitter, _BasePromise):
+    finished = False
+    cancelled = False
+    succeeded = None
+    value = None
+    exception = None
+    _progress = None
+
+    def done(self, data=None, success=True, err=None):
+        """Indicate that this promise is complete
+
+        This will now trigger its completion functions
+
+        Parameters
+        ----------
+        data : object, optional
+            Object passed into each callbacks EventData.data
+        success : Bool, optional
+            If successful (default), run the success callbacks. Else, the
+            failure callbacks.
+        err : Error
+            If set, call the error callback. Generally failure callbacks
+            get called with this
+        """
+        if self.finished:
+            return
+        # Set first, so that callbacks throwing or cancelling this promise
+        # do not complete it a second time
+        self.finished = True
+        self.succeeded = success
+        self.value = data
+        self.exception = err
+        errors = None
+        if self._progress is not None:
+            errors = self._end_progress()
+        # Every outcome is fired even if a callback raises, so that
+        # complete callbacks and all_off always run; the first error is
+        # raised at the end
+        if success:
+            errors = self._run('success', data, errors)
+        else:
+            errors = self._run('failure', data, errors)
+        if err is not None:
+            errors = self._run('error', err, errors)
+        errors = self._run('complete', data, errors)
+        self.all_off()
+        if errors:
+            raise errors[0][1], None, errors[0][2]
+
+    def _run(self, name, data, errors=None):
+        """Fire an outcome of this promise, adding its errors to errors"""
+        evt = self.fire(name, data=data, cancellable=False, late_throw=False)
+        if not evt._errors:
+            return errors
+        if errors is None:
+            return evt._errors
+        errors.extend(evt._errors)
+        return errors
+
+    def _subscribe(self, event, callback, *args, **kwargs):
+        # Do not allow hooking after completion
+        if self.finished:
+            raise RuntimeError('Promise has already completed')
+        return super(Promise, self)._subscribe(event, callback, *args,
+                                               **kwargs)
+
     def success(self, callback=None):
         """Add a callback when this promise succeeds
 
@@ -106,86 +544,459 @@ class Promise(Emitter):
         """
         return self.on('complete', callback)
 
-    @staticmethod
-    def all(*promises, **kwargs):
-        """Create a new promise that acts on the completion of all
-        passed promises.
+    def on_cancel(self, callback=None):
+        """Add a callback when this promise is cancelled
 
-        'success' is fired if all promises are successful. 'fail' is fired
-        as soon as any of them fail. 'error' is thrown if throw_error is True
-        and any of them error.
+        Producers use it to stop the work the promise stands for.
 
         Parameters
         ----------
-        promise_1 ... promise_n : Promise
-            Promises to wait for
-        throw_error : Bool, optional
-            If False (default), this will continue until all promises are
-            complete before throwing its failure. Else throw immediately.
+        callback : function(EventData)
+            Callback to call. If not set, this will be a decorator.
         """
-        new_promise = Promise()
-        new_promise.waiting_for = list(promises)
+        return self.on('cancel', callback)
+
+    def _fire_cancel(self):
+        return self.fire('cancel', cancellable=False, late_throw=False)._errors
+
+    def _unhook(self, handle):
+        """Remove the complete callback added with handle"""
+        handle.cancel()
+
+
+class FastPromise(_BasePromise):
+    """Promise keeping its callbacks in fixed slots instead of an Emitter
+
+    It has the success, failure, error and complete hooks of Promise, and
+    all, any and then, but completing it builds an EventData only for the
+    outcomes that have callbacks and never touches an event table.
+
+    Callbacks added after completion run immediately if their outcome
+    happened, instead of raising RuntimeError. Unlike Promise, it has no
+    on, off, once or fire and must not be hooked from several threads at
+    once.
+
+    Examples
+    --------
+    >>> promise = FastPromise()
+    >>> promise.done(42)
+    >>> promise.success(handle)  # Called right away with evt.data == 42
+    """
+    __slots__ = ('finished', 'cancelled', 'succeeded', 'value', 'exception',
+                 'waiting_for', '_on_success', '_on_failure', '_on_error',
+                 '_on_complete', '_on_cancel', '_progress', '__weakref__')
+
+    def __init__(self):
+        self.finished = False
+        self.cancelled = False
+        self.succeeded = None
+        self.value = None
+        self.exception = None
+        # Each slot holds None, a single callback or a list of them
+        self._on_success = None
+        self._on_failure = None
+        self._on_error = None
+        self._on_complete = None
+        self._on_cancel = None
+        self._progress = None
 
-        @new_promise.complete
-        def cleanup(evt):
-            new_promise.waiting_for = None
+    def done(self, data=None, success=True, err=None):
+        """Indicate that this promise is complete
 
-        def one_finished(evt):
-            if new_promise.waiting_for:  # In case cleanup has been called
-                new_promise.waiting_for.remove(evt.source)
-            if not new_promise.waiting_for:
-                new_promise.done()
+        See Promise.done. Every callback of the outcome runs even if one
+        raises; the first exception is raised once they all have.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        self.succeeded = success
+        self.value = data
+        self.exception = err
+        if success:
+            callbacks = self._on_success
+            name = 'success'
+        else:
+            callbacks = self._on_failure
+            name = 'failure'
+        on_error = self._on_error
+        on_complete = self._on_complete
+        self._on_success = self._on_failure = None
+        self._on_error = self._on_complete = self._on_cancel = None
+        errors = None
+        if self._progress is not None:
+            errors = self._end_progress()
+        if callbacks is not None:
+            errors = self._run(name, data, callbacks, errors)
+        if err is not None and on_error is not None:
+            errors = self._run('error', err, on_error, errors)
+        if on_complete is not None:
+            errors = self._run('complete', data, on_complete, errors)
+        if errors:
+            raise errors[0][1], None, errors[0][2]
+
+    def _run(self, name, data, callbacks, errors=None):
+        """Call callbacks with a new event, adding its errors to errors"""
+        evt = EventData(name, self, data, False)
+        if type(callbacks) is not list:
+            callbacks = (callbacks,)
+        Emitter._dispatch(evt, callbacks, True)
+        if not evt._errors:
+            return errors
+        if errors is None:
+            return evt._errors
+        errors.extend(evt._errors)
+        return errors
+
+    def _late(self, name, data, callback):
+        """Run a callback added after completion"""
+        errors = self._run(name, data, callback)
+        if errors:
+            raise errors[0][1], None, errors[0][2]
 
-        def one_error(evt):
-            new_promise.throw(evt.data)
+    def success(self, callback=None):
+        """Add a callback when this promise succeeds
 
-        for promise in promises:
-            promise.complete(one_finished)
-            if kwargs.get('throw_error', False):
-                promise.error(one_error)
-            promise.failure(new_promise.fail)
-        if not promises:
-            new_promise.done()
-        return new_promise
+        Parameters
+        ----------
+        callback : function(EventData)
+            Callback to call. If not set, this will be a decorator.
 
-    @staticmethod
-    def any(*promises, **kwargs):
-        """Create a new promise that acts on the success of any of the
-        passed promises.
+        Returns
+        -------
+        callback : function(EventData)
+        """
+        if callback is None:
+            return self.success
+        if not self.finished:
+            self._on_success = _add_callback(self._on_success, callback)
+        elif self.succeeded:
+            self._late('success', self.value, callback)
+        return callback
 
-        'success' is fired as soon as any promise succeeds. 'fail' is fired
-        if all of them fail. 'error' is thrown if throw_error is True and
-        and of them error.
+    def failure(self, callback=None):
+        """Add a callback when this promise fails. Generally this also
+        gets called when the promise errs.
 
         Parameters
         ----------
-        promise_1 ... promise_n : Promise
-            Promises to wait for
-        throw_error : Bool, optional
-            If False (default), this will continue until any promises are
-            complete before throwing its failure. Else throw immediately.
+        callback : function(EventData)
+            Callback to call. If not set, this will be a decorator.
+
+        Returns
+        -------
+        callback : function(EventData)
+        """
+        if callback is None:
+            return self.failure
+        if not self.finished:
+            self._on_failure = _add_callback(self._on_failure, callback)
+        elif not self.succeeded:
+            self._late('failure', self.value, callback)
+        return callback
+
+    def error(self, callback=None):
+        """Add a callback when this promise errs
+
+        Parameters
+        ----------
+        callback : function(EventData)
+            Callback to call. If not set, this will be a decorator.
+
+        Returns
+        -------
+        callback : function(EventData)
         """
-        new_promise = Promise()
-        new_promise.waiting_for = list(promises)
+        if callback is None:
+            return self.error
+        if not self.finished:
+            self._on_error = _add_callback(self._on_error, callback)
+        elif self.exception is not None:
+            self._late('error', self.exception, callback)
+        return callback
 
-        @new_promise.complete
-        def cleanup(evt):
-            new_promise.waiting_for = None
+    def complete(self, callback=None):
+        """Add a callback when this promise completes regardless of its
+        sucess
 
-        def one_failed(evt):
-            if new_promise.waiting_for:  # In case cleanup has been called
-                new_promise.waiting_for.remove(evt.source)
-            if not new_promise.waiting_for:
-                new_promise.fail()
+        Parameters
+        ----------
+        callback : function(EventData)
+            Callback to call. If not set, this will be a decorator.
 
-        def one_error(evt):
-            new_promise.throw(evt.data)
+        Returns
+        -------
+        callback : function(EventData)
+        """
+        if callback is None:
+            return self.complete
+        if not self.finished:
+            self._on_complete = _add_callback(self._on_complete, callback)
+        else:
+            self._late('complete', self.value, callback)
+        return callback
 
-        for promise in promises:
-            promise.success(new_promise.done)
-            if kwargs.get('throw_error', False):
-                promise.error(one_error)
-            promise.failure(one_failed)
+    def on_cancel(self, callback=None):
+        """Add a callback when this promise is cancelled
+
+        Parameters
+        ----------
+        callback : function(EventData)
+            Callback to call. If not set, this will be a decorator.
+
+        Returns
+        -------
+        callback : function(EventData)
+        """
+        if callback is None:
+            return self.on_cancel
+        if not self.finished:
+            self._on_cancel = _add_callback(self._on_cancel, callback)
+        elif self.cancelled:
+            self._late('cancel', None, callback)
+        return callback
+
+    def _fire_cancel(self):
+        callbacks = self._on_cancel
+        if callbacks is None:
+            return None
+        self._on_cancel = None
+        return self._run('cancel', None, callbacks)
+
+    def _unhook(self, handle):
+        """Remove the complete callback handle"""
+        callbacks = self._on_complete
+        if callbacks is handle:
+            self._on_complete = None
+        elif type(callbacks) is list:
+            for index, callback in enumerate(callbacks):
+                if callback is handle:
+                    del callbacks[index]
+                    break
+
+
+def _add_callback(current, callback):
+    """Add callback to the contents of a FastPromise callback slot"""
+    if current is None:
+        return callback
+    if type(current) is list:
+        current.append(callback)
+        return current
+    return [current, callback]
+
+
+class _Combinator(object):
+    """Shared state of Promise.all, Promise.any and Promise.race
+
+    Everything but promise is dropped once promise completes, so that a
+    completed promise does not keep the passed promises alive.
+
+    Attributes
+    ----------
+    promise : Promise
+        Promise completed from the passed promises
+    sources : tuple or None
+        The passed promises
+    remaining : int
+        Number of passed promises that have not completed
+    results : list or None
+        Data of the completed promises, by position
+    first : bool or None
+        If True, complete on the first success (any). If False, on the
+        first failure (all). If None, on the first completion (race)
+    throw_error : bool
+        Whether to throw as soon as any passed promise errs
+    cancel_losers : bool
+        Whether to cancel the passed promises left once promise completes
+        early or is cancelled
+    handles : list or None
+        Handles of the complete callbacks on the passed promises, by
+        position, to unhook them with
+    """
+    __slots__ = ('promise', 'sources', 'remaining', 'results', 'first',
+                 'throw_error', 'cancel_losers', 'handles')
+
+    def __init__(self, promise, promises, first, throw_error,
+                 cancel_losers=False):
+        self.promise = promise
+        self.sources = promises
+        self.remaining = len(promises)
+        self.results = [None] * len(promises)
+        self.first = first
+        self.throw_error = throw_error
+        self.cancel_losers = cancel_losers
+        self.handles = [None] * len(promises)
+        promise.waiting_for = promises
+        promise.complete(self.finish)
+        if cancel_losers:
+            promise.on_cancel(lambda evt: self.release())
+        handles = self.handles
+        for index, source in enumerate(promises):
+            if promise.finished:
+                # Settled by a promise that was already done
+                break
+            handles[index] = source.complete(_Slot(self, index))
         if not promises:
-            new_promise.done()
-        return new_promise
+            promise.done([])
+
+    def settle(self, index, source):
+        """Account for the completion of the passed promise at index"""
+        promise = self.promise
+        if promise.finished:
+            return
+        if self.first is None:
+            done = (source.value, source.succeeded, source.exception)
+        elif self.throw_error and source.exception is not None:
+            done = (None, False, source.exception)
+        elif source.succeeded == self.first:
+            # First success of any, first failure of all
+            done = (source.value, self.first)
+        else:
+            self.results[index] = source.value
+            self.remaining -= 1
+            if not self.remaining:
+                promise.done(self.results, success=not self.first)
+            return
+        # finish lets go of them while promise completes
+        sources = self.sources
+        try:
+            promise.done(*done)
+        finally:
+            if self.cancel_losers:
+                for loser, other in enumerate(sources):
+                    if loser != index:
+                        other.cancel()
+
+    def release(self):
+        """Unhook from the passed promises that are not done, and cancel
+        them if cancel_losers is set"""
+        sources = self.sources
+        if sources is None:
+            return
+        handles = self.handles
+        for index, source in enumerate(sources):
+            if source.finished:
+                continue
+            handle = handles[index]
+            if handle is not None:
+                handles[index] = None
+                source._unhook(handle)
+            if self.cancel_losers:
+                source.cancel()
+
+    def finish(self, evt):
+        """Unhook from the passed promises and drop them along with the
+        results once promise completes"""
+        sources = self.sources
+        handles = self.handles
+        self.sources = self.handles = self.results = None
+        self.promise.waiting_for = None
+        for index, source in enumerate(sources):
+            handle = handles[index]
+            if handle is not None and not source.finished:
+                source._unhook(handle)
+
+
+class _Slot(object):
+    """Completion handler of the passed promise at index"""
+    __slots__ = ('combinator', 'index')
+
+    def __init__(self, combinator, index):
+        self.combinator = combinator
+        self.index = index
+
+    def __call__(self, evt):
+        self.combinator.settle(self.index, evt.source)
+
+
+class _Throttle(object):
+    """Progress callback of a promise called at most once per interval
+
+    Attributes
+    ----------
+    last : float or None
+        Clock time of the last call
+    pending : object
+        Latest value notified since then
+    timer : Timer or None
+        Timer of the next call, set while a value is pending
+    """
+    __slots__ = ('promise', 'callback', 'interval', 'wheel', 'last',
+                 'pending', 'timer', 'lock')
+
+    def __init__(self, promise, callback, interval, wheel):
+        self.promise = promise
+        self.callback = callback
+        self.interval = interval
+        self.wheel = wheel
+        self.last = None
+        self.pending = None
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def offer(self, value):
+        """Call back with value now, or keep it for the next call"""
+        with self.lock:
+            if self.timer is not None:
+                self.pending = value
+                return
+            now = self.wheel.clock()
+            wait = None if self.last is None else \
+                self.last + self.interval - now
+            if wait is not None and wait > 0:
+                self.pending = value
+                self.timer = self.wheel.schedule(wait, self.flush)
+                return
+            self.last = now
+        self.callback(EventData('progress', self.promise, value, False))
+
+    def flush(self, cancel=False):
+        """Call back with the pending value, if any"""
+        with self.lock:
+            timer = self.timer
+            if timer is None:
+                return
+            self.timer = None
+            if cancel:
+                timer.cancel()
+            value = self.pending
+            self.pending = None
+            self.last = self.wheel.clock()
+        self.callback(EventData('progress', self.promise, value, False))
+
+
+class _Then(object):
+    """Step of a then chain completing promise from a callback"""
+    __slots__ = ('promise', 'on_success', 'on_failure')
+
+    def __init__(self, promise, on_success, on_failure):
+        self.promise = promise
+        self.on_success = on_success
+        self.on_failure = on_failure
+
+    def __call__(self, evt):
+        _trampoline(self.run, evt.source)
+
+    def run(self, source):
+        promise = self.promise
+        if source.succeeded:
+            callback = self.on_success
+            arg = source.value
+        else:
+            callback = self.on_failure
+            arg = source.value if source.exception is None else \
+                source.exception
+        if callback is None:
+            promise._adopt(source)
+            return
+        try:
+            result = callback(arg)
+        except Exception as err:
+            promise.throw(err)
+            return
+        if not isinstance(result, _BasePromise):
+            promise.done(result)
+        elif result.finished:
+            promise._adopt(result)
+        else:
+            result.complete(
+                lambda evt: _trampoline(promise._adopt, evt.source))
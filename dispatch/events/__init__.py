@@ -1,5 +1,14 @@
+from batch import BatchHandler
+from emitter import Emitter, listen
+from event import STOP, BatchResult, EventData, lazy, transient
+from eventqueue import EventQueue, EventQueueFull
+from profiling import Profiler
+from stream import Stream, StreamClosed
+from subscription import Subscription
+from threadsafe import ThreadSafeEmitter
+from timer import TimerWheel
 
-from emitter import Emitter
-from event import EventData
-
-__all__ = ['Emitter', 'EventData']
+__all__ = ['STOP', 'BatchHandler', 'BatchResult', 'Emitter', 'EventData',
+           'EventQueue', 'EventQueueFull', 'Profiler', 'Stream',
+           'StreamClosed', 'Subscription', 'ThreadSafeEmitter', 'TimerWheel',
+           'lazy', 'listen', 'transient']
@@ -0,0 +1,120 @@
+"""asyncio support for events
+
+asyncio is optional. On Python 2 the trollius backport is used when it is
+installed.
+"""
+from collections import deque
+import functools
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+from event import STOP
+
+
+def require_asyncio():
+    """Get the asyncio module
+
+    Raises
+    ------
+    RuntimeError
+        If neither asyncio nor trollius can be imported
+    """
+    if asyncio is None:
+        raise RuntimeError('asyncio (or trollius on Python 2) is required')
+    return asyncio
+
+
+def is_awaitable(obj):
+    """Whether obj is a coroutine, future or other awaitable"""
+    return (asyncio.iscoroutine(obj) or isinstance(obj, asyncio.Future) or
+            hasattr(obj, '__await__'))
+
+
+class AsyncDispatch(object):
+    """Awaits the awaitables returned by the handlers of one event
+
+    Attributes
+    ----------
+    evt : EventData
+        The fired event. Errors of awaited handlers are added to it
+    future : asyncio.Future
+        Settled with evt once every awaitable has finished
+    profiler : func(evt, callback) or None
+        Profiler of the emitter class, called with each handler. A
+        profiler with a call_async method, such as Profiler, times
+        handlers returning an awaitable until it has finished
+    """
+    def __init__(self, evt, late_throw=True, concurrency=None, loop=None,
+                 profiler=None):
+        self.evt = evt
+        self.late_throw = late_throw
+        self.concurrency = concurrency
+        self.loop = loop
+        self.profiler = profiler
+        self.waiting = deque()
+        self.running = 0
+        self.future = asyncio.Future(loop=loop)
+
+    def wrap(self, callback):
+        """Wrap a handler to collect the awaitable it may return"""
+        profiler = self.profiler
+        call_async = getattr(profiler, 'call_async', None)
+
+        def call(evt):
+            start = None
+            if call_async is not None:
+                ret, start = call_async(evt, callback)
+            elif profiler is not None:
+                ret = profiler(evt, callback)
+            else:
+                ret = callback(evt)
+            if ret is None or ret is STOP or not is_awaitable(ret):
+                return ret
+            self.waiting.append((ret, callback, start))
+            self._start()
+        return call
+
+    def _start(self):
+        while self.waiting and (self.concurrency is None or
+                                self.running < self.concurrency):
+            ret, callback, start = self.waiting.popleft()
+            task = asyncio.ensure_future(ret, loop=self.loop)
+            self.running += 1
+            if start is not None:
+                task.add_done_callback(
+                    functools.partial(self._timed, callback, start))
+            task.add_done_callback(self._finished)
+
+    def _timed(self, callback, start, task):
+        """Record the time a profiled handler took until its task finished"""
+        profiler = self.profiler
+        error = task.cancelled() or task.exception() is not None
+        profiler.record(self.evt, callback, profiler.clock() - start, error)
+
+    def _finished(self, task):
+        self.running -= 1
+        if task.cancelled():
+            err = asyncio.CancelledError()
+        else:
+            err = task.exception()
+        if err is not None:
+            self.evt.add_error((type(err), err,
+                                getattr(err, '__traceback__', None)))
+        self._start()
+        self.settle()
+
+    def settle(self):
+        """Settle the future if no handler is still running"""
+        if self.running or self.waiting or self.future.done():
+            return
+        errors = self.evt._errors
+        if self.late_throw and errors:
+            self.future.set_exception(errors[0][1])
+        else:
+            self.future.set_result(self.evt)
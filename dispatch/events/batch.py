@@ -0,0 +1,93 @@
+import threading
+
+from timer import default_wheel
+
+
+class BatchHandler(object):
+    """Event handler that passes EventData to its handler in lists
+
+    Events are collected as they are fired and handed over once max_size
+    of them are pending, max_delay seconds after the first pending event
+    or when flush is called. The handler is never called concurrently, and
+    batches are handed over in the order their events were fired, whether
+    a fire, the flush timer or flush hands them over.
+
+    Attributes
+    ----------
+    handler : func(list)
+        Callback given the list of pending EventData
+    max_size : int
+        Number of pending events that triggers a flush
+    max_delay : float or None
+        Seconds after the first pending event to flush on a timer. If None,
+        pending events wait for max_size or flush
+    wheel : TimerWheel or None
+        Wheel of the flush timer. None for the shared one
+    subscription : Subscription or None
+        Subscription of this handler once hooked by Emitter.on_batch.
+        Cancelling it flushes the pending events
+    """
+    def __init__(self, handler, max_size=100, max_delay=None, wheel=None):
+        self.handler = handler
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.wheel = wheel
+        self.pending = []
+        self.timer = None
+        self.closed = False
+        self.lock = threading.Lock()
+        # Held while taking and handing over a batch, so batches go out one
+        # at a time and in order. Reentrant for handlers firing the event
+        self.delivery = threading.RLock()
+        self.subscription = None
+
+    def __call__(self, evt):
+        with self.lock:
+            self.pending.append(evt)
+            if len(self.pending) < self.max_size and not self.closed:
+                if self.max_delay is not None and self.timer is None:
+                    wheel = self.wheel
+                    if wheel is None:
+                        wheel = default_wheel()
+                    self.timer = wheel.schedule(self.max_delay, self.flush)
+                return
+        self.flush()
+
+    def _take(self):
+        """Detach the pending events and stop the flush timer"""
+        batch = self.pending
+        self.pending = []
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return batch
+
+    def flush(self):
+        """Hand all pending events to the handler now
+
+        Returns
+        -------
+        count : int
+            Number of events flushed
+        """
+        with self.delivery:
+            with self.lock:
+                batch = self._take()
+            if batch:
+                self.handler(batch)
+        return len(batch)
+
+    def close(self):
+        """Flush the pending events and hand later ones over right away
+
+        Called when the subscription is cancelled. Events fired
+        concurrently with the cancel are still handed over.
+
+        Returns
+        -------
+        count : int
+            Number of events flushed
+        """
+        with self.lock:
+            self.closed = True
+        return self.flush()
@@ -1,27 +1,276 @@
 
-import functools
+import bisect
 import sys
 
-from event import EventData, EventCancelled, EventDeferred
+from aio import AsyncDispatch, require_asyncio
+from batch import BatchHandler
+from event import (BatchResult, EventData, EventCancelled, EventDeferred,
+                   STOP, lazy)
+from eventqueue import default_queue
+from parallel import ExecutorDispatch
+from rate import RateLimiter
+from stream import Stream
+from subscription import Subscription, _sequence
+from trie import EventTrie, is_pattern
+
+
+class _Snapshot(object):
+    """Immutable view of the handlers an event dispatches to
+
+    Attributes
+    ----------
+    subscriptions : tuple
+        Active subscriptions in the order they are called
+    callbacks : tuple
+        Handlers of subscriptions, in the same order
+    transient : bool
+        Whether every handler is declared transient, so the fired
+        EventData may be recycled
+    """
+    __slots__ = ('subscriptions', 'callbacks', 'transient')
+
+    def __init__(self, subscriptions):
+        callbacks = []
+        transient = True
+        for sub in subscriptions:
+            callbacks.append(sub.handler())
+            if transient:
+                transient = getattr(sub.target(), 'transient', False)
+        self.subscriptions = tuple(subscriptions)
+        self.callbacks = tuple(callbacks)
+        self.transient = transient
+
+
+_EMPTY_SNAPSHOT = _Snapshot(())
+
+# Most snapshots cached per emitter or class. Event names matching a
+# wildcard pattern, such as correlation ids, would otherwise pile up
+SNAPSHOT_LIMIT = 1024
+
+
+def listen(event, priority=0, phase='main'):
+    """Hook a method to an event of every instance of an Emitter subclass
+
+    The method is called as method(self, evt). Handlers declared this way
+    are collected once per class, the first time one of its instances
+    fires, and shared by all of its instances, which only allocate handler tables of their own when
+    Emitter.on is used on them.
+
+    Parameters
+    ----------
+    event : str
+        Event or wildcard pattern to attach to
+    priority : int, optional
+        Handlers with a higher priority are called first
+    phase : {'pre', 'main', 'post'}, optional
+        Phase of the event the handler is called in
+
+    Examples
+    --------
+    >>> class Connection(Emitter):
+            @listen('close')
+            def log_close(self, evt):
+                print('Connection closed')
+    >>> Connection().fire('close')
+    Connection closed
+    """
+    def wrapper(func):
+        try:
+            listen_to = func.listen_to
+        except AttributeError:
+            listen_to = func.listen_to = []
+        listen_to.append((event, priority, phase, next(_sequence)))
+        return func
+    return wrapper
+
+
+class _ClassHandler(object):
+    """Calls a method declared with listen on the emitter of the event"""
+    __slots__ = ('func', 'transient')
+
+    def __init__(self, func):
+        self.func = func
+        self.transient = getattr(func, 'transient', False)
+
+    def __call__(self, evt):
+        return self.func(evt.source, evt)
+
+
+class _Profiled(object):
+    """Calls a handler through the profiler of its emitter class"""
+    __slots__ = ('profiler', 'callback')
+
+    def __init__(self, profiler, callback):
+        self.profiler = profiler
+        self.callback = callback
+
+    def __call__(self, evt):
+        return self.profiler(evt, self.callback)
+
+
+class _ClassTable(object):
+    """Shared handler table of an Emitter class
+
+    Built from the methods declared with listen the first time an instance
+    of the class without handlers of its own fires, or when handlers are
+    hooked to such an instance.
+
+    Attributes
+    ----------
+    owner : type
+        Class the table was built for. Subclasses inherit the attribute
+        holding the table, so they check they own it before using it
+    handlers : dict
+        Subscriptions of methods declared with listen, by event
+    wildcards : EventTrie or None
+        Subscriptions of methods declared with listen on patterns
+    snapshots : dict
+        Snapshots of the class handlers, used by instances without
+        handlers of their own
+    """
+    __slots__ = ('owner', 'handlers', 'wildcards', 'snapshots')
+
+    def __init__(self, cls):
+        members = {}
+        for klass in reversed(cls.__mro__):
+            members.update(vars(klass))
+        handlers = {}
+        wildcards = None
+        for member in members.values():
+            for event, priority, phase, seq in getattr(member, 'listen_to',
+                                                       ()):
+                subscription = Subscription(None, event,
+                                            _ClassHandler(member),
+                                            priority=priority, phase=phase,
+                                            seq=seq)
+                if is_pattern(event):
+                    if wildcards is None:
+                        wildcards = EventTrie()
+                    subscriptions = wildcards.node(event, True).subscriptions
+                else:
+                    subscriptions = handlers.setdefault(event, [])
+                bisect.insort_right(subscriptions, subscription)
+        self.owner = cls
+        self.handlers = handlers
+        self.wildcards = wildcards
+        self.snapshots = {}
+
+    @staticmethod
+    def of(cls):
+        """Get the table of cls, building it on first use"""
+        table = cls._class_table
+        if table is None or table.owner is not cls:
+            table = cls._class_table = _ClassTable(cls)
+        return table
+
+    def subscriptions(self, event):
+        """Get the sorted class subscriptions matching event"""
+        subscriptions = self.handlers.get(event, [])
+        if self.wildcards is not None:
+            matched = self.wildcards.match(event)
+            if matched:
+                subscriptions = sorted(subscriptions + matched)
+        return subscriptions
+
+    def snapshot(self, event):
+        """Build and cache the snapshot shared by instances of the class
+
+        As with Emitter._snapshot, the cache is bounded by SNAPSHOT_LIMIT.
+        """
+        subscriptions = self.subscriptions(event)
+        if subscriptions:
+            snapshot = _Snapshot(subscriptions)
+        else:
+            snapshot = _EMPTY_SNAPSHOT
+        snapshots = self.snapshots
+        if len(snapshots) >= SNAPSHOT_LIMIT:
+            snapshots.clear()
+        snapshots[event] = snapshot
+        return snapshot
+
+
+class _ClassSnapshots(object):
+    """Class attribute standing in for the snapshots of an instance
+
+    Instances get a _snapshots dict of their own along with their handler
+    tables, which hides this descriptor. Until then, reading _snapshots
+    gives the snapshots of the class table, so classes need no metaclass.
+    """
+    def __get__(self, obj, cls):
+        table = cls._class_table
+        if table is None or table.owner is not cls:
+            table = _ClassTable.of(cls)
+        return table.snapshots
 
 
 class Emitter(object):
-    def on(self, event, callback=None):
+    # _ClassTable of the class, see _ClassTable.of
+    _class_table = None
+    _snapshots = _ClassSnapshots()
+    # Created along with the first wildcard subscription
+    _wildcards = None
+    # Cancelled subscriptions not yet swept, by event
+    _dead = None
+    # func(evt, callback) calling every handler when set, see Profiler
+    profiler = None
+    # TimerWheel of rate limited and batch handlers, None for the shared one
+    timer_wheel = None
+    # EventQueue of emit_later, None for the shared one
+    event_queue = None
+
+    def on(self, event, callback=None, priority=0, phase='main',
+           weak=False, debounce=None, throttle=None, coalesce=None):
         """Hook to an event
 
         Parameters
         ----------
         event : str
-            Event to attach to
+            Event to attach to. Segments of event names are separated by
+            ':'. A '*' segment matches any one segment, and a '**' segment
+            matches any number of segments, so 'order:*' is called for
+            'order:create' and '**' for every event
         callback : func(EventData)
             Callback to call when event is fired. If not specified, this is
             used as a decorator
+        priority : int, optional
+            Callbacks with a higher priority are called first. Callbacks
+            of equal priority are called in the order they were hooked
+        phase : {'pre', 'main', 'post'}, optional
+            Every 'pre' callback is called before the 'main' (default) ones,
+            and every 'post' callback after them. Priority orders callbacks
+            within a phase
+        weak : bool, optional
+            If True, only keep a weak reference to callback (or to the
+            instance of a bound method), and unhook it once it is garbage
+            collected
+        debounce : float, optional
+            If set, only call back once the event has not been fired for
+            this many seconds, with the data of the latest event
+        throttle : float, optional
+            If set, call back at most once every this many seconds. An
+            event fired sooner is held back until the interval is over,
+            and replaced by any later one
+        coalesce : func(pending, data) or (func(), func(pending, data))
+            With debounce or throttle, merge the data of each held back
+            event into the pending data with this reducer, instead of
+            keeping the latest. The data of the first event is the pending
+            data as is, unless an (initial, reducer) pair is given: the
+            data of every event is then merged into a value created by
+            initial(), and callback always gets such a value
 
         Returns
         -------
+        subscription : Subscription
+            Handle to remove callback with subscription.cancel()
         wrapper : func
             A decorator if callback is not set
 
+        Raises
+        ------
+        ValueError
+            If both debounce and throttle are set, or coalesce without
+            either
+
         Examples
         --------
         >>> emitter = Emitter()
@@ -35,25 +284,214 @@ class Emitter(object):
         Event called me!
         Event called me too!
 
-        """
-        try:
-            self.event_handlers[event]
-        except AttributeError:
-            self.event_handlers = {event: []}
-        except KeyError:
-            self.event_handlers[event] = []
+        Callbacks may cancel the event by returning STOP
 
+        >>> @emitter.on('some_event', phase='pre')
+            def my_func3(evt):
+                return STOP
+        >>> emitter.fire('some_event').cancelled
+        True
+
+        Handlers of frequent events may be rate limited. Timers run on the
+        timer_wheel of the emitter, by default the shared one
+
+        >>> @emitter.on('position', throttle=0.1)
+            def redraw(evt):
+                draw(evt.data)
+        >>> emitter.on('invalidate', flush_keys, debounce=0.05,
+                       coalesce=(set, lambda keys, key: keys | {key}))
+        """
+        rate = None
+        if debounce is not None or throttle is not None or \
+                coalesce is not None:
+            rate = (debounce, throttle, coalesce)
         if callback is None:
             def wrapper(func):
-                self.event_handlers[event].append(func)
+                self._subscribe(event, func, priority=priority, phase=phase,
+                                weak=weak, rate=rate)
                 return func
             return wrapper
         else:
-            self.event_handlers[event].append(callback)
+            return self._subscribe(event, callback, priority=priority,
+                                   phase=phase, weak=weak, rate=rate)
+
+    def _subscribe(self, event, callback, once=False, priority=0,
+                   phase='main', weak=False, rate=None):
+        """Insert a subscription into the handlers of event
+
+        The handlers are kept sorted by phase and priority at this point,
+        so fire does not need to order them.
+
+        Parameters
+        ----------
+        rate : tuple, optional
+            Debounce, throttle and coalesce arguments of a RateLimiter
+
+        Returns
+        -------
+        subscription : Subscription
+        """
+        subscription = Subscription(self, event, callback, once, priority,
+                                    phase, weak)
+        if rate is not None:
+            subscription.limiter = RateLimiter(subscription, *rate,
+                                               wheel=self.timer_wheel)
+        bisect.insort_right(self._subscriptions(event, create=True),
+                            subscription)
+        self._invalidate(event)
+        return subscription
+
+    def _subscriptions(self, event, create=False):
+        """Get the list of subscriptions hooked to an event or pattern
+
+        Parameters
+        ----------
+        event : str
+            Event name or wildcard pattern
+        create : bool
+            If True, create the list if it does not exist yet
+
+        Returns
+        -------
+        subscriptions : list or None
+            None if nothing was hooked to event and create is False
+        """
+        try:
+            handlers = self.event_handlers
+        except AttributeError:
+            if not create:
+                return None
+            handlers = self.event_handlers = {}
+            self._snapshots = {}
+        if is_pattern(event):
+            trie = self._wildcards
+            if trie is None:
+                if not create:
+                    return None
+                trie = self._wildcards = EventTrie()
+            node = trie.node(event, create)
+            return None if node is None else node.subscriptions
+        try:
+            return handlers[event]
+        except KeyError:
+            if not create:
+                return None
+            subscriptions = handlers[event] = []
+            return subscriptions
+
+    def _discard(self, subscription):
+        """Account for a cancelled subscription
+
+        Cancelled subscriptions stay in their list until the next snapshot
+        of their event is built. Once they make up more than half of the
+        list, it is swept right away so that unfired events do not grow
+        without bound under churn. A list left empty is removed along with
+        its pattern trie nodes.
+        """
+        event = subscription.event
+        subscriptions = self._subscriptions(event)
+        if subscriptions is None:
+            # Detached by all_off
+            return
+        self._invalidate(event)
+        dead = self._dead
+        if dead is None:
+            dead = self._dead = {}
+        count = dead.get(event, 0) + 1
+        if count * 2 > len(subscriptions):
+            subscriptions[:] = [sub for sub in subscriptions if sub.active]
+            dead.pop(event, None)
+            if not subscriptions:
+                if is_pattern(event):
+                    self._wildcards.prune(event)
+                else:
+                    del self.event_handlers[event]
+        else:
+            dead[event] = count
+
+    def _claim(self, subscription):
+        """Use up a once subscription before its callback is called
+
+        Returns
+        -------
+        claimed : bool
+            True if subscription was active and is now cancelled, False if
+            another fire already claimed it
+        """
+        if not subscription.active:
+            return False
+        subscription.cancel()
+        return True
+
+    def _invalidate(self, event):
+        """Forget the dispatch snapshot of event after its handlers changed
+
+        A change to a wildcard pattern forgets every snapshot, as any
+        event may match it. Only call this once the instance has handler
+        tables of its own, so the snapshots shared by its class are kept.
+        """
+        snapshots = self._snapshots
+        if is_pattern(event):
+            snapshots.clear()
+        else:
+            snapshots.pop(event, None)
+
+    def _snapshot(self, event):
+        """Build and cache the immutable snapshot of handlers fired for event
+
+        Snapshots are only rebuilt after on/off/once changed the handlers
+        of event, so fire does not need to copy the handler list or match
+        wildcard patterns. Handlers added while a fire is running do not
+        appear in the snapshot that fire is iterating. Cancelled
+        subscriptions are dropped here in one pass. Events without handlers
+        are cached too, so firing them stays cheap, and the cache is cleared
+        once it holds SNAPSHOT_LIMIT events, so firing many distinct event
+        names does not grow it.
+
+        Until handlers are hooked to the instance itself, self._snapshots
+        is the dict of its class table, shared by every instance without
+        handlers. The instance gets its own dict along with event_handlers.
+        """
+        try:
+            handlers = self.event_handlers
+        except AttributeError:
+            # Nothing hooked to this instance: share the class snapshot
+            return _ClassTable.of(type(self)).snapshot(event)
+        subscriptions = handlers.get(event)
+        if subscriptions is not None:
+            active = [sub for sub in subscriptions if sub.active]
+            if not active:
+                del handlers[event]
+            elif len(active) != len(subscriptions):
+                handlers[event] = active
+            if self._dead:
+                self._dead.pop(event, None)
+        else:
+            active = []
+        trie = self._wildcards
+        if trie is not None:
+            matched = trie.match(event)
+            if matched:
+                active = sorted(active + matched)
+        inherited = _ClassTable.of(type(self)).subscriptions(event)
+        if inherited:
+            active = sorted(inherited + active)
+        if active:
+            snapshot = _Snapshot(active)
+        else:
+            snapshot = _EMPTY_SNAPSHOT
+        snapshots = self._snapshots
+        if len(snapshots) >= SNAPSHOT_LIMIT:
+            snapshots.clear()
+        snapshots[event] = snapshot
+        return snapshot
 
     def off(self, event, callback):
         """Remove callback from an event
 
+        Prefer cancelling the Subscription returned by on, which does not
+        need to search for callback.
+
         Parameters
         ----------
         event : str
@@ -67,12 +505,17 @@ class Emitter(object):
         ValueError
             If the callback is not attached to this event
         """
-        try:
-            self.event_handlers[event].remove(callback)
-        except (AttributeError, KeyError):
+        subscriptions = self._subscriptions(event)
+        if subscriptions is None:
             raise ValueError('Callback not found')
+        for sub in subscriptions:
+            if sub.active and sub.target() == callback:
+                sub.cancel()
+                return
+        raise ValueError('Callback not found')
 
-    def once(self, event, callback=None):
+    def once(self, event, callback=None, priority=0, phase='main',
+             weak=False):
         """Hook to an event once.
 
         Parameters
@@ -82,40 +525,146 @@ class Emitter(object):
         callback : func(EventData)
             Callback to call when event is fired. If not specified, this is
             used as a decorator
+        priority : int, optional
+            Callbacks with a higher priority are called first
+        phase : {'pre', 'main', 'post'}, optional
+            Phase of the event the callback is called in
+        weak : bool, optional
+            If True, only keep a weak reference to callback
 
         Returns
         -------
+        subscription : Subscription
+            Handle to remove callback with subscription.cancel()
         wrapper : func
             A decorator if callback is not set
         """
 
         if callback is None:
             def wrapper(func):
-                @functools.wraps(func)
-                def call_once(*args, **kwargs):
-                    ret = func(*args, **kwargs)
-                    self.off(event, call_once)
-                    return ret
-                self.on(event, call_once)
+                self._subscribe(event, func, once=True, priority=priority,
+                                phase=phase, weak=weak)
                 return func
             return wrapper
         else:
-            @functools.wraps(callback)
-            def call_once(*args, **kwargs):
-                ret = callback(*args, **kwargs)
-                self.off(event, call_once)
-                return ret
-            self.on(event, call_once)
+            return self._subscribe(event, callback, once=True,
+                                   priority=priority, phase=phase, weak=weak)
+
+    def on_batch(self, event, handler, max_size=100, max_delay=None,
+                 priority=0):
+        """Hook a handler that receives lists of events
+
+        The returned BatchHandler takes the place of a normal handler of
+        event, so handlers registered around it keep their order.
+
+        Parameters
+        ----------
+        event : str
+            Event to attach to
+        handler : func(list)
+            Callback given a list of EventData
+        max_size : int
+            Number of pending events that triggers a call to handler
+        max_delay : float, optional
+            If set, call handler this many seconds after the first pending
+            event at the latest, from a timer of the timer_wheel of this
+            emitter, by default the shared one
+        priority : int, optional
+            Handlers with a higher priority are called first
+
+        Returns
+        -------
+        batch : BatchHandler
+            Hooked handler. Use batch.flush() to pass pending events now and
+            batch.subscription.cancel() to remove it, which flushes them
+
+        Examples
+        --------
+        >>> emitter = Emitter()
+        >>> def write_rows(events):
+                print(len(events))
+        >>> batch = emitter.on_batch('row', write_rows, max_size=2)
+        >>> emitter.fire('row', 1)
+        >>> emitter.fire('row', 2)
+        2
+        >>> emitter.fire('row', 3)
+        >>> batch.flush()
+        1
+        """
+        batch = BatchHandler(handler, max_size, max_delay, self.timer_wheel)
+        batch.subscription = self.on(event, batch, priority=priority)
+        return batch
+
+    def stream(self, event, maxsize=0, policy='block', data_only=False):
+        """Iterate over the events fired for event
+
+        Parameters
+        ----------
+        event : str
+            Event or wildcard pattern to stream
+        maxsize : int, optional
+            Number of unconsumed events to buffer at most. 0 (default) for
+            no bound
+        policy : {'block', 'drop_oldest', 'drop_newest'}, optional
+            What fire does when the buffer is full: wait for the consumer
+            (default), drop the oldest buffered event or drop the new one
+        data_only : bool, optional
+            If True, yield evt.data instead of the EventData
+
+        Returns
+        -------
+        stream : Stream
+            Iterator. Under asyncio, its get_async gives a future of the
+            next event instead. It unhooks itself once closed or garbage
+            collected
+
+        Examples
+        --------
+        >>> with emitter.stream('order:*', maxsize=100) as orders:
+                for evt in orders:
+                    process(evt.data)
+        """
+        return Stream(self, event, maxsize, policy, data_only)
 
     def all_off(self):
         """Remove all events"""
         try:
             del self.event_handlers
         except AttributeError:
-            pass
+            return
+        del self._snapshots
+        attrs = self.__dict__
+        attrs.pop('_wildcards', None)
+        attrs.pop('_dead', None)
+
+    def has_listeners(self, event):
+        """Check whether firing event would call any handler
+
+        Wildcard and class handlers count. This reads the snapshot fire
+        uses, so it only matches patterns again after handlers changed.
+
+        Parameters
+        ----------
+        event : str
+            Event to check
+
+        Returns
+        -------
+        listened : bool
+
+        Examples
+        --------
+        >>> if emitter.has_listeners('trace'):
+                emitter.fire('trace', dump_state(request))
+        """
+        try:
+            snapshot = self._snapshots[event]
+        except (AttributeError, KeyError):
+            snapshot = self._snapshot(event)
+        return bool(snapshot.callbacks)
 
     def fire(self, event, data=None, cancellable=True, catch_errors=True,
-             late_throw=True):
+             late_throw=True, pooled=False, executor=None):
         """Fires an event
 
         Parameters
@@ -123,63 +672,363 @@ class Emitter(object):
         event : str
             Event to fire
         data : object
-            Data passed to the event
+            Data passed to the event. A lazy object is only evaluated if
+            the event has handlers
         cancellable : bool
-            If True (default), callbacks can be stopped by calling evt.cancel()
+            If True (default), callbacks can be stopped by calling
+            evt.cancel() or by returning STOP
         catch_errors : bool
             If True (default), callbacks will all be called even if there
             is an exception thrown
         late_throw : bool
             If True (default), this function will raise the first exception
             thrown
+        pooled : bool
+            If True, the EventData is taken from and given back to the
+            EventData pool when every handler of this event is declared
+            transient. Nothing is returned when pooled.
+        executor : concurrent.futures.Executor, optional
+            If set, every handler is submitted to this thread or process
+            pool at once and a Promise is returned. Handlers then run in
+            parallel and in no particular order; cancelling only stops
+            handlers that have not started, and deferred handlers are run
+            again once the others have finished. Once handlers are used up
+            when submitted. With a process pool, the handlers and data must
+            be picklable and handlers get a copy of the event without its
+            source, so rate limited, batch and listen handlers cannot run
+            there.
 
         Returns
         -------
         evt : EventData
-            The passed event.
+            The passed event, or None if pooled is True.
+        promise : Promise
+            If executor is set, a promise completed with the passed event
+            once every handler has finished. With late_throw, it fails with
+            the first exception thrown.
 
         Raises
         ------
         err : Exception
             If catch_errors is False, this raises the error that is
             generated by callback()
+        ValueError
+            If executor is a process pool and a handler or the event cannot
+            be sent to another process
 
         See Also
         --------
         event.EventData
+        event.transient
         """
-        evt = EventData(event, self, data, cancellable)
         try:
-            callbacks = self.event_handlers[event]
-        except (KeyError, AttributeError):
-            pass
+            snapshot = self._snapshots[event]
+        except (AttributeError, KeyError):
+            snapshot = self._snapshot(event)
+        if type(data) is lazy and snapshot.callbacks:
+            data = data()
+        if executor is not None:
+            from dispatch.async import Promise
+            promise = Promise()
+            ExecutorDispatch(EventData(event, self, data, cancellable),
+                             executor, promise, late_throw).start(
+                                 snapshot.subscriptions)
+            return promise
+        if pooled and snapshot.transient:
+            evt = EventData.acquire(event, self, data, cancellable)
         else:
-            deferred_callbacks = []
-
-            def process_callbacks(callbacks):
-                for callback in callbacks[:]:
-                    if evt.cancelled:
-                        return evt
-                    try:
-                        callback(evt)
-                    except EventCancelled as cancel_exc:
-                        # Check to see if nested and actually called for this
-                        if cancel_exc.evt == evt:
-                            return evt
-                        else:
-                            # Raise until this event is caught
-                            raise
-                    except EventDeferred:
-                        deferred_callbacks.append(callback)
-                    except Exception as err:
-                        if catch_errors:
-                            evt.add_error(sys.exc_info())
-                        else:
-                            raise err
-            process_callbacks(callbacks)
-            if deferred_callbacks:
-                evt.deferred = True
-                process_callbacks(deferred_callbacks)
-        if late_throw and evt.errors:
-            raise evt.errors[0][1], None, evt.errors[0][2]
+            evt = EventData(event, self, data, cancellable)
+        if snapshot.callbacks:
+            self._dispatch(evt, snapshot.callbacks, catch_errors)
+        errors = evt._errors
+        if pooled:
+            if snapshot.transient:
+                evt.release()
+            evt = None
+        if late_throw and errors:
+            raise errors[0][1], None, errors[0][2]
         return evt
+
+    def emit_later(self, event, data=None, cancellable=True, priority=0,
+                   timeout=None):
+        """Queue an event to be fired when its event queue is drained
+
+        Unlike fire, this does not call any handler, so handlers can emit
+        events without recursing. The event is fired by the drain or run
+        of the event_queue of this emitter, by default the shared queue of
+        eventqueue.default_queue, with the cancel and error handling of
+        fire.
+
+        Parameters
+        ----------
+        event : str
+            Event to fire
+        data : object
+            Data passed to the event
+        cancellable : bool
+            If True (default), callbacks can stop the event
+        priority : int, optional
+            Queued events of a higher priority are fired first
+        timeout : float, optional
+            Seconds to wait for room in a full queue with the 'block'
+            policy. Waits for as long as needed by default
+
+        Returns
+        -------
+        queued : bool
+            False if the overflow policy of the queue dropped the event
+
+        Raises
+        ------
+        EventQueueFull
+            If the queue stayed full, see EventQueue.put
+
+        Examples
+        --------
+        >>> emitter.event_queue = EventQueue(maxsize=1000)
+        >>> @emitter.on('order:create')
+            def notify(evt):
+                emitter.emit_later('mail:send', evt.data)
+        >>> emitter.emit_later('order:create', order)
+        >>> emitter.event_queue.drain()
+        """
+        queue = self.event_queue
+        if queue is None:
+            queue = default_queue()
+        return queue.put(self, event, data, cancellable, priority, timeout)
+
+    def fire_async(self, event, data=None, cancellable=True,
+                   catch_errors=True, late_throw=True, concurrency=None,
+                   loop=None):
+        """Fires an event and awaits the coroutines its handlers return
+
+        Handlers are called in order as with fire. Coroutines and futures
+        they return are scheduled on the asyncio loop and run concurrently.
+
+        Parameters
+        ----------
+        event : str
+            Event to fire
+        data : object
+            Data passed to the event. A lazy object is only evaluated if
+            the event has handlers
+        cancellable : bool
+            If True (default), callbacks can be stopped by calling
+            evt.cancel() or by returning STOP. Coroutines that are already
+            scheduled keep running
+        catch_errors : bool
+            If True (default), callbacks will all be called even if there
+            is an exception thrown. Errors of coroutines are always added
+            to the event
+        late_throw : bool
+            If True (default), the returned future raises the first
+            exception thrown
+        concurrency : int, optional
+            Maximum number of coroutines running at once
+        loop : asyncio.AbstractEventLoop, optional
+            Loop to schedule coroutines on
+
+        Returns
+        -------
+        future : asyncio.Future
+            Resolves to the EventData once every coroutine has finished
+
+        Raises
+        ------
+        RuntimeError
+            If asyncio is not available
+
+        Examples
+        --------
+        >>> @emitter.on('save')
+            async def save(evt):
+                await db.write(evt.data)
+        >>> evt = await emitter.fire_async('save', row, concurrency=10)
+        """
+        require_asyncio()
+        try:
+            snapshot = self._snapshots[event]
+        except (AttributeError, KeyError):
+            snapshot = self._snapshot(event)
+        if type(data) is lazy and snapshot.callbacks:
+            data = data()
+        evt = EventData(event, self, data, cancellable)
+        dispatch = AsyncDispatch(evt, late_throw, concurrency, loop,
+                                 self._profiler())
+        if snapshot.callbacks:
+            # The dispatch profiles the handlers, timing awaited ones until
+            # they finish
+            self._dispatch(evt, tuple(dispatch.wrap(callback)
+                                      for callback in snapshot.callbacks),
+                           catch_errors, profiled=False)
+        dispatch.settle()
+        return dispatch.future
+
+    def fire_many(self, event, iterable, cancellable=True, catch_errors=True,
+                  late_throw=True, collect=False):
+        """Fires an event once for each data item of iterable
+
+        The handlers are looked up once for the whole batch. Each item is
+        still dispatched separately, so cancel and defer apply to the
+        item they were called for.
+
+        Parameters
+        ----------
+        event : str
+            Event to fire
+        iterable : iterable
+            Data passed to each event
+        cancellable : bool
+            If True (default), callbacks can be stopped by calling evt.cancel()
+        catch_errors : bool
+            If True (default), callbacks will all be called even if there
+            is an exception thrown
+        late_throw : bool
+            If True (default), this function will raise the first exception
+            thrown once every item has been fired
+        collect : bool
+            If True, keep the EventData of every item in result.events
+
+        Returns
+        -------
+        result : BatchResult
+            Counts and errors of the batch
+
+        See Also
+        --------
+        Emitter.fire
+        Emitter.fire_iter
+        """
+        try:
+            snapshot = self._snapshots[event]
+        except (AttributeError, KeyError):
+            snapshot = self._snapshot(event)
+        callbacks = snapshot.callbacks
+        result = BatchResult(collect)
+        # Transient handlers let every item share one event
+        evt = None
+        reuse = snapshot.transient and not collect
+        for index, data in enumerate(iterable):
+            if evt is None or not reuse:
+                evt = EventData(event, self, data, cancellable)
+            else:
+                evt.__init__(event, self, data, cancellable)
+            if callbacks:
+                self._dispatch(evt, callbacks, catch_errors)
+            result.add(index, evt)
+        if late_throw and result.errors:
+            err = result.errors[0][1]
+            raise err[1], None, err[2]
+        return result
+
+    def fire_iter(self, event, iterable, cancellable=True, catch_errors=True,
+                  late_throw=True):
+        """Fires an event for each data item of iterable as it is consumed
+
+        This is the streaming form of fire_many: iterable is only advanced
+        when the next EventData is requested, so unbounded generators can
+        be fired without keeping any results.
+
+        Parameters
+        ----------
+        event : str
+            Event to fire
+        iterable : iterable
+            Data passed to each event
+        cancellable : bool
+            If True (default), callbacks can be stopped by calling evt.cancel()
+        catch_errors : bool
+            If True (default), callbacks will all be called even if there
+            is an exception thrown
+        late_throw : bool
+            If True (default), raise the first exception thrown for an item
+            once its handlers have all been called
+
+        Yields
+        ------
+        evt : EventData
+            The fired event for each item
+
+        See Also
+        --------
+        Emitter.fire_many
+        """
+        try:
+            snapshot = self._snapshots[event]
+        except (AttributeError, KeyError):
+            snapshot = self._snapshot(event)
+        callbacks = snapshot.callbacks
+        for data in iterable:
+            evt = EventData(event, self, data, cancellable)
+            if callbacks:
+                self._dispatch(evt, callbacks, catch_errors)
+            errors = evt._errors
+            if late_throw and errors:
+                raise errors[0][1], None, errors[0][2]
+            yield evt
+
+    @classmethod
+    def _dispatch(cls, evt, callbacks, catch_errors, profiled=True):
+        """Call callbacks with evt, then call back the deferred ones
+
+        Parameters
+        ----------
+        profiled : bool, optional
+            If False, the callbacks are not called through the profiler of
+            the class, as they handle it themselves
+        """
+        if profiled and cls.profiler is not None:
+            profiler = cls._profiler()
+            callbacks = [_Profiled(profiler, callback)
+                         for callback in callbacks]
+        deferred_callbacks = cls._process_callbacks(evt, callbacks,
+                                                    catch_errors)
+        if deferred_callbacks:
+            evt.deferred = True
+            cls._process_callbacks(evt, deferred_callbacks, catch_errors)
+
+    @classmethod
+    def _profiler(cls):
+        """Get the profiler of the class, None if it is not profiled"""
+        profiler = cls.profiler
+        if getattr(profiler, '__self__', True) is None:
+            # A function set on the class reads as an unbound method
+            profiler = profiler.__func__
+        return profiler
+
+    @staticmethod
+    def _process_callbacks(evt, callbacks, catch_errors):
+        """Call each of callbacks with evt
+
+        Returns
+        -------
+        deferred_callbacks : list or None
+            Callbacks that deferred themselves, if any did
+        """
+        deferred_callbacks = None
+        for callback in callbacks:
+            if evt.cancelled:
+                break
+            try:
+                if callback(evt) is STOP:
+                    if evt.cancellable:
+                        evt.cancelled = True
+                    break
+            except EventCancelled as cancel_exc:
+                # Check to see if nested and actually called for this
+                if cancel_exc.evt == evt:
+                    break
+                else:
+                    # Raise until this event is caught
+                    raise
+            except EventDeferred:
+                if deferred_callbacks is None:
+                    deferred_callbacks = [callback]
+                else:
+                    deferred_callbacks.append(callback)
+            except Exception:
+                if catch_errors:
+                    evt.add_error(sys.exc_info())
+                else:
+                    raise
+        return deferred_callbacks
@@ -0,0 +1,255 @@
+import bisect
+from collections import deque
+import sys
+import threading
+import time
+
+from event import BatchResult
+
+POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+
+class EventQueueFull(Exception):
+    """Raised when an event cannot be queued in time"""
+
+
+class EventQueue(object):
+    """Bounded queue of events fired later, in order
+
+    Emitter.emit_later queues events here instead of calling their
+    handlers. drain or run then fires them one after another, so handlers
+    that emit more events do not recurse and events run in the order they
+    were queued. Events of a higher priority run first.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Number of queued events from which the queue is full. 0 (default)
+        for no bound
+    policy : {'block', 'drop_oldest', 'drop_newest'}, optional
+        What queuing into a full queue does: wait for room (default), drop
+        the oldest queued event of the lowest priority, or drop the new
+        event
+
+    Attributes
+    ----------
+    max_depth : int
+        Most events ever queued at once
+    enqueued : int
+        Events queued so far
+    dispatched : int
+        Events taken off the queue to be fired so far
+    dropped : int
+        Events dropped by the overflow policy
+
+    Examples
+    --------
+    >>> queue = EventQueue(maxsize=1000, policy='drop_oldest')
+    >>> emitter.event_queue = queue
+    >>> emitter.emit_later('tick', now)
+    >>> queue.drain()
+    """
+    def __init__(self, maxsize=0, policy='block'):
+        if policy not in POLICIES:
+            raise ValueError('Unknown policy {0!r}'.format(policy))
+        self.maxsize = maxsize
+        self.policy = policy
+        # Events by priority, and the priorities in increasing order
+        self._queues = {}
+        self._priorities = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition(threading.Lock())
+        self._draining = None
+        self.max_depth = 0
+        self.enqueued = 0
+        self.dispatched = 0
+        self.dropped = 0
+
+    def __len__(self):
+        """Number of queued events"""
+        return self._size
+
+    def put(self, emitter, event, data=None, cancellable=True, priority=0,
+            timeout=None):
+        """Queue event to be fired from emitter
+
+        Parameters
+        ----------
+        timeout : float, optional
+            With the 'block' policy, seconds to wait for room. Waits for as
+            long as needed by default
+
+        Returns
+        -------
+        queued : bool
+            False if the event was dropped
+
+        Raises
+        ------
+        EventQueueFull
+            If the queue stayed full for timeout seconds, or is full while
+            a handler drained from it queues an event, which would wait
+            for itself
+        """
+        item = (emitter, event, data, cancellable)
+        with self._condition:
+            if self.maxsize and self._size >= self.maxsize:
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                elif self.policy == 'drop_oldest':
+                    self._pop(lowest=True)
+                    self.dropped += 1
+                else:
+                    self._wait_for_room(timeout)
+            try:
+                queue = self._queues[priority]
+            except KeyError:
+                queue = self._queues[priority] = deque()
+                bisect.insort(self._priorities, priority)
+            queue.append(item)
+            self._size += 1
+            self.enqueued += 1
+            if self._size > self.max_depth:
+                self.max_depth = self._size
+            self._condition.notify_all()
+        return True
+
+    def _wait_for_room(self, timeout):
+        if self._draining is threading.current_thread():
+            raise EventQueueFull('Queue is full and drained by this thread')
+        if timeout is not None:
+            # Condition.wait does not tell whether it timed out
+            deadline = time.time() + timeout
+        while self._size >= self.maxsize:
+            if timeout is None:
+                self._condition.wait()
+                continue
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise EventQueueFull('Queue stayed full')
+            self._condition.wait(remaining)
+
+    def _pop(self, lowest=False):
+        """Take the oldest event of the highest or lowest priority"""
+        priorities = self._priorities
+        if not lowest:
+            priorities = reversed(priorities)
+        for priority in priorities:
+            queue = self._queues[priority]
+            if queue:
+                self._size -= 1
+                return queue.popleft()
+        return None
+
+    def get(self):
+        """Take the next event without firing it
+
+        Returns
+        -------
+        item : tuple or None
+            (emitter, event, data, cancellable) or None if the queue is
+            empty
+        """
+        with self._condition:
+            item = self._pop()
+            if item is not None:
+                self.dispatched += 1
+                self._condition.notify_all()
+            return item
+
+    def drain(self, max_items=None, catch_errors=True, late_throw=True):
+        """Fire queued events until the queue is empty
+
+        Events queued by the handlers are fired in the same drain.
+
+        Parameters
+        ----------
+        max_items : int, optional
+            Fire at most this many events
+        catch_errors : bool
+            If True (default), every handler of an event is called even if
+            one raises
+        late_throw : bool
+            If True (default), raise the first exception thrown once the
+            queue is drained
+
+        Returns
+        -------
+        result : BatchResult
+            Counts, cancelled events and errors of the fired events
+        """
+        result = BatchResult()
+        draining = self._draining
+        self._draining = threading.current_thread()
+        try:
+            while max_items is None or result.count < max_items:
+                item = self.get()
+                if item is None:
+                    break
+                emitter, event, data, cancellable = item
+                evt = emitter.fire(event, data, cancellable, catch_errors,
+                                   late_throw=False)
+                result.add(result.count, evt)
+        finally:
+            self._draining = draining
+        if late_throw and result.errors:
+            err = result.errors[0][1]
+            raise err[1], None, err[2]
+        return result
+
+    def run(self, on_error=None):
+        """Fire queued events as they come until close is called
+
+        Parameters
+        ----------
+        on_error : func(exc_info), optional
+            Called with each error raised by a handler. Defaults to
+            sys.excepthook
+        """
+        if on_error is None:
+            on_error = lambda exc_info: sys.excepthook(*exc_info)
+        while True:
+            with self._condition:
+                while not self._size and not self._closed:
+                    self._condition.wait()
+                if not self._size:
+                    return
+            for index, exc_info in self.drain(late_throw=False).errors:
+                on_error(exc_info)
+
+    def close(self):
+        """Let run return once the queued events are fired"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def stats(self):
+        """Get the depth metrics of this queue
+
+        Returns
+        -------
+        stats : dict
+            'depth', 'max_depth', 'enqueued', 'dispatched' and 'dropped'
+        """
+        return {'depth': self._size, 'max_depth': self.max_depth,
+                'enqueued': self.enqueued, 'dispatched': self.dispatched,
+                'dropped': self.dropped}
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def default_queue():
+    """Get the unbounded EventQueue shared by emitters without their own
+
+    Nothing drains it by itself: call its drain or run.
+    """
+    global _default_queue
+    if _default_queue is None:
+        with _default_lock:
+            if _default_queue is None:
+                _default_queue = EventQueue()
+    return _default_queue
@@ -0,0 +1,181 @@
+import sys
+import threading
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
+
+from batch import BatchHandler
+from event import EventCancelled, EventDeferred, STOP
+
+
+def _check_picklable(obj, what):
+    """Raise ValueError if obj cannot be sent to a process pool
+
+    A process pool that fails to pickle a call leaves its future pending
+    forever, so this is checked before submitting.
+    """
+    try:
+        pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    except Exception as err:
+        raise ValueError('{0} cannot be sent to another process: {1}'.format(
+            what, err))
+
+
+class ExecutorDispatch(object):
+    """Runs the handlers of one event on a concurrent.futures executor
+
+    Every handler is submitted at once, so they run in parallel and in no
+    particular order. Cancelling the event only stops handlers that have
+    not started yet, and deferred handlers are submitted again once all
+    the others have finished.
+
+    Attributes
+    ----------
+    evt : EventData
+        The fired event. Errors of the handlers are added to it
+    promise : Promise
+        Completed with evt once every handler has finished
+    refused : Exception or None
+        Error of the executor refusing a handler, for instance once it is
+        shut down. The promise then fails with it
+    """
+    def __init__(self, evt, executor, promise, late_throw=True):
+        self.evt = evt
+        self.executor = executor
+        self.promise = promise
+        self.late_throw = late_throw
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.deferred = []
+        self.refused = None
+
+    def start(self, subscriptions):
+        """Run the handlers of subscriptions with the event
+
+        Once and weak subscriptions are resolved here rather than in the
+        workers, so their callbacks are submitted as they are.
+
+        Raises
+        ------
+        ValueError
+            If the executor is a process pool and a handler or the event
+            cannot be sent to it
+        """
+        processes = ProcessPoolExecutor is not None and \
+            isinstance(self.executor, ProcessPoolExecutor)
+        targets = [(sub, self._target(sub, processes))
+                   for sub in subscriptions]
+        if processes:
+            _check_picklable(self.evt, 'Event {0!r}'.format(self.evt.name))
+            for sub, callback in targets:
+                if callback is not None:
+                    _check_picklable(callback,
+                                     'Handler {0!r}'.format(callback))
+        callbacks = []
+        for sub, callback in targets:
+            if callback is None:
+                continue
+            # Used up when submitted, not when the worker calls it
+            if sub.once and not sub.emitter._claim(sub):
+                continue
+            callbacks.append(callback)
+        self.submit(callbacks)
+
+    @staticmethod
+    def _target(sub, processes):
+        """Get the callable to submit for sub, None if its callback is gone
+
+        Once subscriptions are not used up here.
+        """
+        if sub.emitter is None or sub.limiter is not None or \
+                type(sub.callback) is BatchHandler:
+            if processes:
+                # They keep state in, or need the emitter of, this process
+                raise ValueError('Rate limited, batch and listen handlers '
+                                 'of {0!r} cannot run in another '
+                                 'process'.format(sub.event))
+            return sub.handler()
+        callback = sub.target()
+        if callback is None:
+            sub.cancel()
+        return callback
+
+    def submit(self, callbacks):
+        """Run callbacks with the event
+
+        If the executor refuses a callback, the remaining ones are not
+        submitted and the promise fails with the error once the callbacks
+        already submitted have finished.
+        """
+        futures = []
+        with self.lock:
+            for callback in callbacks:
+                try:
+                    future = self.executor.submit(callback, self.evt)
+                except Exception:
+                    err = sys.exc_info()
+                    self.evt.add_error(err)
+                    self.refused = err[1]
+                    break
+                futures.append(future)
+                self.futures[future] = callback
+            idle = not self.futures
+        for future in futures:
+            future.add_done_callback(self._finished)
+        if idle:
+            self._complete()
+
+    def _finished(self, future):
+        evt = self.evt
+        if future.cancelled():
+            err = result = None
+        else:
+            if hasattr(future, 'exception_info'):
+                # futures backport on Python 2 keeps the traceback apart
+                err, tb = future.exception_info()
+            else:
+                err = future.exception()
+                tb = getattr(err, '__traceback__', None)
+            result = future.result() if err is None else None
+        with self.lock:
+            callback = self.futures.pop(future)
+            cancel = result is STOP or isinstance(err, EventCancelled)
+            if isinstance(err, EventDeferred):
+                self.deferred.append(callback)
+            elif err is not None and not cancel:
+                evt.add_error((type(err), err, tb))
+            if cancel and evt.cancellable:
+                evt.cancelled = True
+                pending = list(self.futures)
+            else:
+                pending = ()
+            finished = not self.futures
+            if finished and self.deferred and not evt.cancelled and \
+                    not evt.deferred:
+                evt.deferred = True
+                deferred = self.deferred
+            else:
+                deferred = None
+        # Cancelling calls _finished for each pending future
+        for pending_future in pending:
+            pending_future.cancel()
+        if deferred is not None:
+            self.submit(deferred)
+        elif finished:
+            self._complete()
+
+    def _complete(self):
+        errors = self.evt._errors
+        if self.refused is not None:
+            self.promise.done(self.evt, success=False, err=self.refused)
+        elif self.late_throw and errors:
+            self.promise.done(self.evt, success=False, err=errors[0][1])
+        else:
+            self.promise.done(self.evt)
@@ -0,0 +1,266 @@
+import bisect
+import threading
+import timeit
+
+from aio import is_awaitable
+from event import EventCancelled, EventDeferred
+from subscription import Subscription
+
+# Upper bounds in seconds of the latency histogram buckets
+BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0)
+
+
+def _resolve(callback):
+    """Get the callable a callback of Emitter.fire calls and its instance"""
+    owner = getattr(callback, '__self__', None)
+    if not isinstance(owner, Subscription):
+        # Rate limiters and batch handlers
+        owner = getattr(callback, 'subscription', None)
+    if isinstance(owner, Subscription):
+        callback = owner.target()
+        owner = getattr(callback, '__self__', None)
+    # Class handlers and partials
+    return owner, getattr(callback, 'func', callback)
+
+
+def handler_name(callback):
+    """Get a readable name of a callback called by Emitter.fire
+
+    Subscriptions and class handlers are named after the function they
+    wrap, and methods after their class, as 'module.Class.method'.
+    """
+    owner, callback = _resolve(callback)
+    name = getattr(callback, '__name__', None)
+    if name is None:
+        name = type(callback).__name__
+    elif owner is not None:
+        name = '{0}.{1}'.format(type(owner).__name__, name)
+    module = getattr(callback, '__module__', None)
+    if module is None:
+        return name
+    return '{0}.{1}'.format(module, name)
+
+
+def handler_key(callback):
+    """Get what identifies a callback called by Emitter.fire in statistics
+
+    This is the code of the function it wraps, so that lambdas and
+    functions of the same name are told apart, while closures created
+    anew for each subscription share their statistics. Callables without
+    code, such as builtins, are told apart by name.
+    """
+    owner, callback = _resolve(callback)
+    func = getattr(callback, '__func__', callback)
+    try:
+        return func.__code__
+    except AttributeError:
+        return handler_name(callback)
+
+
+class HandlerStats(object):
+    """Calls of one handler for one event
+
+    Attributes
+    ----------
+    calls : int
+    errors : int
+        Calls that raised, not counting cancelled and deferred events
+    total : float
+        Seconds spent in the handler
+    max : float
+        Seconds of the slowest call
+    histogram : list of int
+        Number of calls by latency bucket, the last bucket counting the
+        calls slower than every bound
+    name : str
+        Name of the handler, see handler_name
+    """
+    __slots__ = ('calls', 'errors', 'total', 'max', 'histogram', 'name')
+
+    def __init__(self, buckets, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(buckets) + 1)
+
+    def as_dict(self):
+        return {'calls': self.calls, 'errors': self.errors,
+                'total': self.total, 'max': self.max,
+                'mean': self.total / self.calls if self.calls else 0.0,
+                'histogram': list(self.histogram)}
+
+
+class Profiler(object):
+    """Hook timing every handler call of the events fired
+
+    Any func(evt, callback) returning callback(evt) may be used as the
+    profiler of an Emitter class. This one counts the calls, errors and
+    latencies of each handler of each event, by event name. Handlers are
+    told apart by their code rather than their name, see handler_key.
+    Handlers of Emitter.fire_async returning an awaitable are timed until
+    it has finished, see call_async.
+
+    Profiling is enabled for a class and its subclasses by setting their
+    profiler attribute, as enable does. Without one, dispatching only
+    checks that attribute. Promise callbacks, including those run by
+    Promise.done and FastPromise.done, are profiled through Emitter.
+
+    Parameters
+    ----------
+    slow : float, optional
+        Seconds from which a handler call is slow
+    on_slow : func(EventData, str, float), optional
+        Called with the event, the handler name and the seconds spent after
+        each slow call
+    buckets : tuple of float, optional
+        Increasing upper bounds in seconds of the latency histogram
+    clock : func() -> float, optional
+        Timer to measure with
+
+    Examples
+    --------
+    >>> profiler = Profiler(slow=0.05, on_slow=warn).enable()
+    >>> emitter.fire('request')
+    >>> export(profiler.dump())
+    """
+    def __init__(self, slow=None, on_slow=None, buckets=BUCKETS,
+                 clock=timeit.default_timer):
+        self.slow = slow
+        self.on_slow = on_slow
+        self.buckets = tuple(buckets)
+        self.clock = clock
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def enable(self, cls=None):
+        """Profile the events of cls and its subclasses
+
+        Parameters
+        ----------
+        cls : type, optional
+            Class to profile. Defaults to Emitter
+
+        Returns
+        -------
+        profiler : Profiler
+            This profiler
+        """
+        if cls is None:
+            from emitter import Emitter as cls
+        cls.profiler = self
+        return self
+
+    def disable(self, cls=None):
+        """Stop profiling cls, if this profiles it"""
+        if cls is None:
+            from emitter import Emitter as cls
+        if cls.__dict__.get('profiler') is self:
+            cls.profiler = None
+
+    def __call__(self, evt, callback):
+        start = self.clock()
+        error = True
+        try:
+            result = callback(evt)
+            error = False
+            return result
+        except (EventCancelled, EventDeferred):
+            error = False
+            raise
+        finally:
+            self.record(evt, callback, self.clock() - start, error)
+
+    def call_async(self, evt, callback):
+        """Call callback, leaving an awaitable result to be timed by its task
+
+        Returns
+        -------
+        result : object
+            What callback returned
+        start : float or None
+            Clock reading when callback was called if it returned an
+            awaitable, for record once the awaitable has finished. None if
+            the call was recorded already
+        """
+        start = self.clock()
+        result = None
+        error = True
+        try:
+            result = callback(evt)
+            error = False
+        except (EventCancelled, EventDeferred):
+            error = False
+            raise
+        finally:
+            awaited = not error and is_awaitable(result)
+            if not awaited:
+                self.record(evt, callback, self.clock() - start, error)
+        return result, start if awaited else None
+
+    def record(self, evt, callback, elapsed, error=False):
+        """Account for a call of callback for evt taking elapsed seconds"""
+        key = evt.name, handler_key(callback)
+        with self.lock:
+            try:
+                stats = self.stats[key]
+            except KeyError:
+                stats = self.stats[key] = HandlerStats(self.buckets,
+                                                       handler_name(callback))
+            stats.calls += 1
+            stats.errors += error
+            stats.total += elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+            stats.histogram[bisect.bisect_left(self.buckets, elapsed)] += 1
+        if self.slow is not None and elapsed >= self.slow and \
+                self.on_slow is not None:
+            self.on_slow(evt, stats.name, elapsed)
+
+    def dump(self):
+        """Get the statistics gathered so far
+
+        Returns
+        -------
+        stats : dict
+            'buckets' holds the histogram bounds. 'events' maps event names
+            to dicts mapping handler names to dicts of their 'calls',
+            'errors', 'total', 'max' and 'mean' seconds and 'histogram'.
+            Distinct handlers of an event sharing a name, such as lambdas,
+            are named 'name:line' after the line they are defined on
+        """
+        handlers = {}
+        with self.lock:
+            for (event, key), stats in self.stats.items():
+                handlers.setdefault(event, []).append(
+                    (key, stats.name, stats.as_dict()))
+        events = {}
+        for event, found in handlers.items():
+            counts = {}
+            for key, name, stats in found:
+                counts[name] = counts.get(name, 0) + 1
+            named = events[event] = {}
+            for key, name, stats in sorted(found, key=_definition):
+                if counts[name] > 1:
+                    name = '{0}:{1}'.format(
+                        name, getattr(key, 'co_firstlineno', '?'))
+                    unique = name
+                    count = 1
+                    while unique in named:
+                        count += 1
+                        unique = '{0}#{1}'.format(name, count)
+                    name = unique
+                named[name] = stats
+        return {'buckets': list(self.buckets), 'events': events}
+
+    def reset(self):
+        """Forget the statistics gathered so far"""
+        with self.lock:
+            self.stats = {}
+
+
+def _definition(handler):
+    """Sort key of dump entries, by name and then line of definition"""
+    key, name, stats = handler
+    return name, getattr(key, 'co_firstlineno', 0)
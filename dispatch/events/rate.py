@@ -0,0 +1,126 @@
+import threading
+
+from event import EventData
+from timer import default_wheel
+
+
+class RateLimiter(object):
+    """Handler of a subscription calling its callback at a limited rate
+
+    Set up by Emitter.on with debounce or throttle. Events that are held
+    back only replace the pending data, or are merged into it by the
+    coalesce reducer, so they cost no allocation. The pending data is
+    passed on in a new EventData named and sourced like the latest event,
+    by a timer of the wheel.
+
+    Attributes
+    ----------
+    subscription : Subscription
+        Subscription whose callback is called
+    debounce : float or None
+        Call back once no event was fired for this many seconds
+    throttle : float or None
+        Call back at most once every this many seconds. The first event
+        goes through right away
+    coalesce : func(pending, data) or None
+        Merges the data of a held back event into the pending data. If
+        None, the latest data wins
+    initial : func() or None
+        Creates the value the data of the first event is merged into. If
+        None, the data of the first event is the pending data as is
+    wheel : TimerWheel
+        Wheel of the timers and of the clock
+    """
+    __slots__ = ('subscription', 'debounce', 'throttle', 'coalesce',
+                 'initial', 'wheel', 'lock', 'timer', 'deadline', 'last',
+                 'pending', 'name', 'source', 'held')
+
+    def __init__(self, subscription, debounce=None, throttle=None,
+                 coalesce=None, wheel=None):
+        if (debounce is None) == (throttle is None):
+            raise ValueError('Rate limiting needs either debounce or '
+                             'throttle')
+        if wheel is None:
+            wheel = default_wheel()
+        initial = None
+        if isinstance(coalesce, tuple):
+            initial, coalesce = coalesce
+        self.subscription = subscription
+        self.debounce = debounce
+        self.throttle = throttle
+        self.coalesce = coalesce
+        self.initial = initial
+        self.wheel = wheel
+        self.lock = threading.Lock()
+        self.timer = None
+        self.deadline = None
+        self.last = None
+        self.pending = None
+        self.name = None
+        self.source = None
+        self.held = False
+
+    def __call__(self, evt):
+        with self.lock:
+            now = self.wheel.clock()
+            if self.debounce is not None:
+                # Push the deadline back instead of rescheduling
+                self.deadline = now + self.debounce
+                self._hold(evt)
+                if self.timer is None:
+                    self.timer = self.wheel.schedule(self.debounce,
+                                                     self.flush)
+                return
+            if self.timer is not None:
+                self._hold(evt)
+                return
+            if self.last is not None:
+                wait = self.last + self.throttle - now
+                if wait > 0:
+                    self._hold(evt)
+                    self.timer = self.wheel.schedule(wait, self.flush)
+                    return
+            self.last = now
+        if self.initial is not None:
+            # Called with the merged form of the data, as after holding
+            evt = EventData(evt.name, evt.source,
+                            self.coalesce(self.initial(), evt.data), False)
+        return self.subscription._caller()(evt)
+
+    def _hold(self, evt):
+        """Keep the data of evt for the next call"""
+        if self.held and self.coalesce is not None:
+            self.pending = self.coalesce(self.pending, evt.data)
+        elif self.initial is not None:
+            self.pending = self.coalesce(self.initial(), evt.data)
+        else:
+            self.pending = evt.data
+        self.name = evt.name
+        self.source = evt.source
+        self.held = True
+
+    def flush(self):
+        """Call back with the pending data, once its time has come"""
+        with self.lock:
+            self.timer = None
+            now = self.wheel.clock()
+            if self.debounce is not None and now < self.deadline:
+                self.timer = self.wheel.schedule(self.deadline - now,
+                                                 self.flush)
+                return
+            if not self.held or not self.subscription.active:
+                return
+            evt = EventData(self.name, self.source, self.pending, False)
+            self.pending = self.name = self.source = None
+            self.held = False
+            self.last = now
+        self.subscription._caller()(evt)
+
+    def cancel(self):
+        """Drop the pending data and its timer"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.pending = self.name = self.source = None
+            self.held = False
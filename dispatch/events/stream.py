@@ -0,0 +1,174 @@
+from collections import deque
+import threading
+
+from aio import require_asyncio
+from eventqueue import POLICIES, EventQueueFull
+
+
+class StreamClosed(Exception):
+    """Raised by Stream.get_async once the stream is closed and empty"""
+
+
+class Stream(object):
+    """Iterator over the events fired for an event of an Emitter
+
+    Created by Emitter.stream. Fired events are buffered until consumed.
+    The stream only holds a weak subscription, so it is unhooked when
+    closed or garbage collected.
+
+    Iterating blocks until an event is fired, and stops once the stream is
+    closed and its buffer consumed. Under asyncio, get_async waits on the
+    loop instead.
+
+    Parameters
+    ----------
+    emitter : Emitter
+    event : str
+        Event or wildcard pattern to stream
+    maxsize : int, optional
+        Number of buffered events from which the consumer is behind. 0
+        (default) for no bound
+    policy : {'block', 'drop_oldest', 'drop_newest'}, optional
+        What firing into a full buffer does: wait for the consumer
+        (default), drop the oldest buffered event or drop the new event
+    data_only : bool, optional
+        If True, yield the data of the events instead of their EventData
+
+    Attributes
+    ----------
+    subscription : Subscription
+        Weak subscription feeding the stream
+    dropped : int
+        Events dropped by the policy
+    closed : bool
+    """
+    def __init__(self, emitter, event, maxsize=0, policy='block',
+                 data_only=False):
+        if policy not in POLICIES:
+            raise ValueError('Unknown policy {0!r}'.format(policy))
+        self.maxsize = maxsize
+        self.policy = policy
+        self.data_only = data_only
+        self.dropped = 0
+        self.closed = False
+        # A bounded deque drops its oldest items by itself
+        self._buffer = deque(maxlen=(maxsize or None)
+                             if policy == 'drop_oldest' else None)
+        self._condition = threading.Condition(threading.Lock())
+        # (loop, future) of the pending get_async calls
+        self._waiters = deque()
+        self._consumer = None
+        self.subscription = emitter.on(event, self._push, weak=True)
+
+    def _push(self, evt):
+        item = evt.data if self.data_only else evt
+        with self._condition:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if not future.done():
+                    loop.call_soon_threadsafe(self._resolve, future, item)
+                    return
+            buffer = self._buffer
+            if self.maxsize and len(buffer) >= self.maxsize:
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return
+                elif self.policy == 'drop_oldest':
+                    self.dropped += 1
+                elif self._consumer is threading.current_thread():
+                    raise EventQueueFull(
+                        'Stream is full and consumed by this thread')
+                else:
+                    while len(buffer) >= self.maxsize and not self.closed:
+                        self._condition.wait()
+            if not self.closed:
+                buffer.append(item)
+                self._condition.notify_all()
+
+    def _resolve(self, future, item):
+        if future.cancelled():
+            # Keep the item for the next consumer
+            with self._condition:
+                self._buffer.appendleft(item)
+        else:
+            future.set_result(item)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        with self._condition:
+            self._consumer = threading.current_thread()
+            while not self._buffer:
+                if self.closed:
+                    raise StopIteration
+                self._condition.wait()
+            item = self._buffer.popleft()
+            self._condition.notify_all()
+            return item
+
+    __next__ = next
+
+    def get_async(self, loop=None):
+        """Get a future resolving to the next item
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop, optional
+            Loop of the future. Defaults to the current event loop
+
+        Returns
+        -------
+        future : asyncio.Future
+            Raises StreamClosed once the stream is closed and empty
+
+        Raises
+        ------
+        RuntimeError
+            If asyncio is not available
+
+        Examples
+        --------
+        In a trollius coroutine:
+
+        >>> try:
+                while True:
+                    evt = yield From(stream.get_async())
+            except StreamClosed:
+                pass
+        """
+        asyncio = require_asyncio()
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        future = asyncio.Future(loop=loop)
+        with self._condition:
+            if self._buffer:
+                future.set_result(self._buffer.popleft())
+                self._condition.notify_all()
+            elif self.closed:
+                future.set_exception(StreamClosed())
+            else:
+                self._waiters.append((loop, future))
+        return future
+
+    def close(self):
+        """Unhook the stream and end its iteration once its buffer is
+        consumed"""
+        self.subscription.cancel()
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+            waiters = self._waiters
+            self._waiters = deque()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._end, future)
+
+    def _end(self, future):
+        if not future.done():
+            future.set_exception(StreamClosed())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,160 @@
+import itertools
+import weakref
+
+from batch import BatchHandler
+
+try:
+    from weakref import WeakMethod
+except ImportError:
+    class WeakMethod(object):
+        """Weak reference to a bound method
+
+        Backport of weakref.WeakMethod: calling it returns the bound method,
+        or None once its instance has been garbage collected.
+        """
+        __slots__ = ('_self', '_func')
+
+        def __init__(self, method, callback=None):
+            if callback is not None:
+                self._self = weakref.ref(method.__self__,
+                                         lambda ref: callback(self))
+            else:
+                self._self = weakref.ref(method.__self__)
+            self._func = method.__func__
+
+        def __call__(self):
+            obj = self._self()
+            if obj is None:
+                return None
+            return self._func.__get__(obj, type(obj))
+
+# Registration order of subscriptions, across events, patterns and classes
+_sequence = itertools.count()
+
+# Phases of an event, in the order their subscriptions are called
+PHASES = ('pre', 'main', 'post')
+
+
+class Subscription(object):
+    """Handle of a callback hooked to an event of an Emitter
+
+    Returned by Emitter.on and Emitter.once.
+
+    Attributes
+    ----------
+    emitter : Emitter
+        Emitter the callback is hooked to
+    event : str
+        Event the callback is hooked to
+    callback : func(EventData) or weak reference
+        Hooked callback, or a weak reference to it if weak. Use target()
+        to get the callback in both cases
+    once : bool
+        Whether the callback is removed after its first call
+    active : bool
+        False once the subscription has been cancelled
+    priority : int
+        Subscriptions with a higher priority are called first
+    phase : str
+        One of PHASES. Every 'pre' subscription is called before the 'main'
+        ones, which are called before the 'post' ones
+    weak : bool
+        Whether only a weak reference to the callback is kept. The
+        subscription is cancelled when the callback, or the instance of a
+        bound method, is garbage collected
+    seq : int
+        Registration order of this subscription
+    limiter : RateLimiter or None
+        Handler limiting the rate of calls, if debounced or throttled
+    """
+    __slots__ = ('emitter', 'event', 'callback', 'once', 'active',
+                 'priority', 'phase', 'weak', 'seq', 'limiter', '_order')
+
+    def __init__(self, emitter, event, callback, once=False, priority=0,
+                 phase='main', weak=False, seq=None):
+        self.emitter = emitter
+        self.event = event
+        if weak:
+            if getattr(callback, '__self__', None) is not None and \
+                    hasattr(callback, '__func__'):
+                callback = WeakMethod(callback, self._expire)
+            else:
+                callback = weakref.ref(callback, self._expire)
+        self.callback = callback
+        self.weak = weak
+        self.once = once
+        self.active = True
+        self.priority = priority
+        self.phase = phase
+        self.seq = next(_sequence) if seq is None else seq
+        self.limiter = None
+        try:
+            self._order = (PHASES.index(phase), -priority, self.seq)
+        except ValueError:
+            raise ValueError('Unknown phase {0!r}'.format(phase))
+
+    def __lt__(self, other):
+        # Call order: phase, highest priority first, then registration order
+        return self._order < other._order
+
+    def cancel(self):
+        """Remove the callback from its event
+
+        This only flags the subscription, so it takes constant time. The
+        emitter drops all cancelled subscriptions of an event at once the
+        next time the event is fired. The pending events of a batch
+        handler are flushed.
+        """
+        if self.active:
+            self.active = False
+            if self.limiter is not None:
+                self.limiter.cancel()
+            self.emitter._discard(self)
+            if type(self.callback) is BatchHandler:
+                self.callback.close()
+
+    def _expire(self, ref):
+        # The weakly referenced callback was garbage collected
+        self.cancel()
+
+    def target(self):
+        """Get the hooked callback
+
+        Returns
+        -------
+        callback : func(EventData) or None
+            None if the callback was weakly referenced and is gone
+        """
+        if self.weak:
+            return self.callback()
+        return self.callback
+
+    def handler(self):
+        """Get the callable that Emitter.fire calls for this subscription"""
+        if self.limiter is not None:
+            return self.limiter
+        return self._caller()
+
+    def _caller(self):
+        """Get the callable calling the callback as once and weak require"""
+        if self.weak:
+            return self.call_weak
+        if self.once:
+            return self.call_once
+        return self.callback
+
+    def call_once(self, evt):
+        """Cancel this subscription and call the callback"""
+        # Another fire, nested or on another thread, may have used this up
+        if self.emitter._claim(self):
+            return self.callback(evt)
+
+    def call_weak(self, evt):
+        """Call the weakly referenced callback if it is still alive"""
+        callback = self.callback()
+        if callback is None:
+            self.cancel()
+        elif not self.once:
+            return callback(evt)
+        elif self.emitter._claim(self):
+            return callback(evt)
@@ -0,0 +1,50 @@
+import threading
+
+from emitter import Emitter
+
+
+class ThreadSafeEmitter(Emitter):
+    """Emitter that can be hooked, unhooked and fired from many threads
+
+    Changes to the handlers are serialized under a lock, and so is building
+    the snapshot of an event after a change. Firing an event whose snapshot
+    is already published only reads it and never takes the lock.
+
+    Subclasses overriding __init__ must call ThreadSafeEmitter.__init__.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def _subscribe(self, event, callback, *args, **kwargs):
+        with self._lock:
+            return super(ThreadSafeEmitter, self)._subscribe(
+                event, callback, *args, **kwargs)
+
+    def _discard(self, subscription):
+        with self._lock:
+            super(ThreadSafeEmitter, self)._discard(subscription)
+
+    def _claim(self, subscription):
+        # Firing does not take the lock, so once handlers are claimed here
+        with self._lock:
+            return super(ThreadSafeEmitter, self)._claim(subscription)
+
+    def _snapshot(self, event):
+        with self._lock:
+            # Another thread may have published it while this one waited
+            try:
+                return self._snapshots[event]
+            except KeyError:
+                return super(ThreadSafeEmitter, self)._snapshot(event)
+
+    def off(self, event, callback):
+        with self._lock:
+            super(ThreadSafeEmitter, self).off(event, callback)
+
+    off.__doc__ = Emitter.off.__doc__
+
+    def all_off(self):
+        with self._lock:
+            super(ThreadSafeEmitter, self).all_off()
+
+    all_off.__doc__ = Emitter.all_off.__doc__
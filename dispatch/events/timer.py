@@ -0,0 +1,286 @@
+import atexit
+import sys
+import threading
+import time
+
+from aio import require_asyncio
+
+
+class Timer(object):
+    """Callback scheduled on a TimerWheel
+
+    Attributes
+    ----------
+    deadline : int
+        Tick of the wheel the callback is due at
+    callback : func(*args) or None
+        Function to call, None once fired or cancelled
+    args : tuple
+        Arguments of callback
+    """
+    __slots__ = ('wheel', 'deadline', 'callback', 'args', '_bucket')
+
+    def __init__(self, wheel, deadline, callback, args):
+        self.wheel = wheel
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self._bucket = None
+
+    @property
+    def active(self):
+        return self.callback is not None
+
+    def cancel(self):
+        """Stop this timer from firing. Does nothing if it already has"""
+        wheel = self.wheel
+        with wheel._lock:
+            self.callback = None
+            bucket = self._bucket
+            if bucket is not None:
+                self._bucket = None
+                bucket.discard(self)
+                wheel._count -= 1
+
+
+class TimerWheel(object):
+    """Hierarchical timer wheel
+
+    Timers live in buckets of levels of slots each. A bucket of level 0
+    holds the timers due on one tick, and a bucket of level n those due
+    within slots ** n ticks; its timers move down a level once the wheel
+    reaches it. Scheduling and cancelling take constant time however many
+    timers are pending, and advancing costs one step per tick plus one per
+    moved or fired timer.
+
+    The wheel does not run by itself. Call advance regularly, or have it
+    done by a background thread with start or by an asyncio loop with
+    attach.
+
+    Parameters
+    ----------
+    tick : float, optional
+        Resolution of the wheel in seconds. Timers fire up to one tick late
+    slots : int, optional
+        Buckets per level
+    levels : int, optional
+        Number of levels. Timers due further than slots ** levels ticks
+        ahead wait in the last level and are moved again until due
+    clock : func() -> float, optional
+        Current time in seconds. Defaults to time.time
+
+    Examples
+    --------
+    >>> wheel = TimerWheel(tick=0.1).start()
+    >>> timer = wheel.schedule(5, print_message, 'too late')
+    >>> timer.cancel()
+    """
+    def __init__(self, tick=0.01, slots=256, levels=4, clock=time.time):
+        self.tick = tick
+        self.slots = slots
+        self.clock = clock
+        self.origin = clock()
+        self.current = 0
+        self._levels = [[set() for i in xrange(slots)]
+                        for level in xrange(levels)]
+        self._count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = None
+        self._handle = None
+
+    def __len__(self):
+        """Number of pending timers"""
+        return self._count
+
+    def schedule(self, delay, callback, *args):
+        """Call callback(*args) once delay seconds have passed
+
+        Parameters
+        ----------
+        delay : float
+            Seconds to wait. Rounded up to a whole tick of at least one
+
+        Returns
+        -------
+        timer : Timer
+            Handle to cancel the call with
+        """
+        with self._lock:
+            ticks = (self.clock() + delay - self.origin) / self.tick
+            deadline = max(int(ticks) + (ticks % 1 > 0), self.current + 1)
+            timer = Timer(self, deadline, callback, args)
+            self._insert(timer)
+            self._count += 1
+        return timer
+
+    def _insert(self, timer):
+        """Put timer in the bucket of the level its deadline falls in"""
+        slots = self.slots
+        remaining = timer.deadline - self.current
+        span = 1
+        for wheel in self._levels:
+            if remaining < span * slots:
+                bucket = wheel[timer.deadline // span % slots]
+                break
+            span *= slots
+        else:
+            # Beyond the wheel, wait in the last bucket to come around
+            span //= slots
+            bucket = wheel[(self.current // span - 1) % slots]
+        bucket.add(timer)
+        timer._bucket = bucket
+
+    def advance(self, now=None):
+        """Fire the timers due by now
+
+        Callbacks run on the calling thread once the due timers are taken
+        off the wheel. If any raise, the first exception is raised after
+        all of them ran.
+
+        Parameters
+        ----------
+        now : float, optional
+            Time to advance to. Defaults to the clock
+
+        Returns
+        -------
+        fired : int
+            Number of callbacks called
+        """
+        if now is None:
+            now = self.clock()
+        target = int((now - self.origin) / self.tick)
+        due = []
+        with self._lock:
+            slots = self.slots
+            levels = self._levels
+            while self.current < target:
+                if not self._count:
+                    self.current = target
+                    break
+                self.current += 1
+                current = self.current
+                if not current % slots:
+                    self._cascade(current)
+                bucket = levels[0][current % slots]
+                if bucket:
+                    levels[0][current % slots] = set()
+                    self._count -= len(bucket)
+                    for timer in bucket:
+                        timer._bucket = None
+                    due.extend(bucket)
+        errors = None
+        for timer in due:
+            callback = timer.callback
+            if callback is None:
+                continue
+            timer.callback = None
+            try:
+                callback(*timer.args)
+            except Exception:
+                if errors is None:
+                    errors = sys.exc_info()
+        if errors is not None:
+            raise errors[0], errors[1], errors[2]
+        return len(due)
+
+    def _cascade(self, current):
+        """Move the timers of the higher level buckets reached down"""
+        slots = self.slots
+        levels = self._levels
+        span = slots
+        top = 1
+        while top < len(levels) - 1 and not current % (span * slots):
+            span *= slots
+            top += 1
+        for level in xrange(top, 0, -1):
+            wheel = levels[level]
+            index = current // span % slots
+            bucket = wheel[index]
+            if bucket:
+                wheel[index] = set()
+                for timer in bucket:
+                    self._insert(timer)
+            span //= slots
+
+    def start(self):
+        """Advance this wheel every tick from a daemon thread
+
+        Returns
+        -------
+        wheel : TimerWheel
+            This wheel
+        """
+        if self._thread is None:
+            self._stopped = threading.Event()
+            self._thread = threading.Thread(target=self._run,
+                                            args=(self._stopped,))
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop advancing from the thread of start or the loop of attach"""
+        thread = self._thread
+        if thread is not None:
+            self._thread = None
+            self._stopped.set()
+            if thread is not threading.current_thread():
+                thread.join()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _run(self, stopped):
+        while not stopped.wait(self.tick):
+            try:
+                self.advance()
+            except Exception:
+                sys.excepthook(*sys.exc_info())
+
+    def attach(self, loop=None):
+        """Advance this wheel every tick from an asyncio loop
+
+        Callbacks then run on the loop.
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop, optional
+            Loop to run on. Defaults to the current event loop
+
+        Returns
+        -------
+        wheel : TimerWheel
+            This wheel
+
+        Raises
+        ------
+        RuntimeError
+            If asyncio is not available
+        """
+        if loop is None:
+            loop = require_asyncio().get_event_loop()
+        if self._handle is None:
+            self._handle = loop.call_later(self.tick, self._on_loop, loop)
+        return self
+
+    def _on_loop(self, loop):
+        self._handle = loop.call_later(self.tick, self._on_loop, loop)
+        self.advance()
+
+
+_default_wheel = None
+_default_lock = threading.Lock()
+
+
+def default_wheel():
+    """Get the shared TimerWheel, started on a daemon thread on first use"""
+    global _default_wheel
+    if _default_wheel is None:
+        with _default_lock:
+            if _default_wheel is None:
+                _default_wheel = TimerWheel().start()
+                # Do not let the thread run into interpreter shutdown
+                atexit.register(_default_wheel.stop)
+    return _default_wheel
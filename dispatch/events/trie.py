@@ -0,0 +1,105 @@
+SEPARATOR = ':'
+WILDCARD = '*'
+GLOBSTAR = '**'
+
+
+def is_pattern(event):
+    """Whether event is a wildcard pattern rather than a concrete name
+
+    Patterns are strings with a '*' segment, matching any one segment, or a
+    '**' segment, matching any number of segments.
+    """
+    if not isinstance(event, basestring) or WILDCARD not in event:
+        return False
+    segments = event.split(SEPARATOR)
+    return WILDCARD in segments or GLOBSTAR in segments
+
+
+class EventTrie(object):
+    """Segment trie of subscriptions hooked to wildcard patterns
+
+    Attributes
+    ----------
+    children : dict
+        Child nodes by segment
+    subscriptions : list
+        Subscriptions whose pattern ends at this node
+    """
+    __slots__ = ('children', 'subscriptions')
+
+    def __init__(self):
+        self.children = {}
+        self.subscriptions = []
+
+    def node(self, pattern, create=False):
+        """Get the node of pattern
+
+        Parameters
+        ----------
+        pattern : str
+            Wildcard pattern
+        create : bool
+            If True, add missing nodes instead of returning None
+        """
+        node = self
+        for segment in pattern.split(SEPARATOR):
+            try:
+                node = node.children[segment]
+            except KeyError:
+                if not create:
+                    return None
+                node.children[segment] = node = EventTrie()
+        return node
+
+    def prune(self, pattern):
+        """Remove the node of pattern, and then its ancestors, while they
+        have neither subscriptions nor children
+        """
+        path = []
+        node = self
+        for segment in pattern.split(SEPARATOR):
+            child = node.children.get(segment)
+            if child is None:
+                return
+            path.append((node, segment))
+            node = child
+        for parent, segment in reversed(path):
+            child = parent.children[segment]
+            if child.subscriptions or child.children:
+                break
+            del parent.children[segment]
+
+    def match(self, event):
+        """Find the active subscriptions whose pattern matches event
+
+        Cancelled subscriptions met along the way are dropped.
+
+        Returns
+        -------
+        subscriptions : list
+        """
+        found = []
+        if isinstance(event, basestring):
+            self._match(event.split(SEPARATOR), 0, found, set())
+        return found
+
+    def _match(self, segments, index, found, seen):
+        globstar = self.children.get(GLOBSTAR)
+        if globstar is not None:
+            # '**' swallows any number of segments, including none
+            for skip in xrange(index, len(segments) + 1):
+                globstar._match(segments, skip, found, seen)
+        if index == len(segments):
+            if self.subscriptions:
+                active = [sub for sub in self.subscriptions if sub.active]
+                if len(active) != len(self.subscriptions):
+                    self.subscriptions = active
+                for sub in active:
+                    if sub not in seen:
+                        seen.add(sub)
+                        found.append(sub)
+            return
+        for segment in (segments[index], WILDCARD):
+            child = self.children.get(segment)
+            if child is not None:
+                child._match(segments, index + 1, found, seen)
@@ -0,0 +1,89 @@
+import unittest
+
+from dispatch import Emitter
+from dispatch.events.aio import asyncio
+
+
+@unittest.skipIf(asyncio is None, 'asyncio is not available')
+class TestFireAsync(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def later(self, delay, result=None, err=None):
+        future = asyncio.Future(loop=self.loop)
+        if err is None:
+            self.loop.call_later(delay, future.set_result, result)
+        else:
+            self.loop.call_later(delay, future.set_exception, err)
+        return future
+
+    def test_fire_async(self):
+        order = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:async')
+        def slow(evt):
+            order.append('slow')
+            future = self.later(0.02)
+            future.add_done_callback(lambda future: order.append('slow done'))
+            return future
+
+        @emitter.on('event:async')
+        def fast(evt):
+            order.append('fast')
+            future = self.later(0.01)
+            future.add_done_callback(lambda future: order.append('fast done'))
+            return future
+
+        @emitter.on('event:async')
+        def sync(evt):
+            order.append('sync')
+
+        future = emitter.fire_async('event:async', 1, loop=self.loop)
+        self.assertEqual(order, ['slow', 'fast', 'sync'])
+        evt = self.loop.run_until_complete(future)
+        self.assertEqual(evt.data, 1)
+        self.assertTrue(evt.success)
+        self.assertEqual(order[3:], ['fast done', 'slow done'])
+
+    def test_fire_async_errors(self):
+        emitter = Emitter()
+        emitter.on('event:async', lambda evt: self.later(0, err=KeyError()))
+        emitter.on('event:async', lambda evt: self.later(0))
+
+        future = emitter.fire_async('event:async', loop=self.loop)
+        with self.assertRaises(KeyError):
+            self.loop.run_until_complete(future)
+        future = emitter.fire_async('event:async', loop=self.loop,
+                                    late_throw=False)
+        evt = self.loop.run_until_complete(future)
+        self.assertEqual(len(evt.errors), 1)
+
+    def test_fire_async_concurrency(self):
+        state = {'running': 0, 'most': 0}
+
+        @asyncio.coroutine
+        def handler(evt):
+            state['running'] += 1
+            state['most'] = max(state['most'], state['running'])
+            yield self.later(0.001)
+            state['running'] -= 1
+
+        emitter = Emitter()
+        for i in range(10):
+            emitter.on('event:async', handler)
+        future = emitter.fire_async('event:async', loop=self.loop,
+                                    concurrency=3)
+        self.loop.run_until_complete(future)
+        self.assertEqual(state['running'], 0)
+        self.assertEqual(state['most'], 3)
+
+    def test_fire_async_sync(self):
+        emitter = Emitter()
+        future = emitter.fire_async('event:async', loop=self.loop)
+        self.assertTrue(future.done())
+        self.assertEqual(future.result().name, 'event:async')
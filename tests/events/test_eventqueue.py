@@ -0,0 +1,112 @@
+import threading
+import unittest
+
+from dispatch import STOP, Emitter, EventQueue, EventQueueFull
+
+
+class TestEventQueue(unittest.TestCase):
+    def setUp(self):
+        self.emitter = Emitter()
+        self.order = []
+        self.emitter.on('event:*', lambda evt: self.order.append(
+            (evt.name, evt.data)))
+
+    def test_fifo(self):
+        queue = self.emitter.event_queue = EventQueue()
+
+        @self.emitter.on('event:first')
+        def first(evt):
+            # Queued behind second instead of recursing
+            self.emitter.emit_later('event:nested', evt.data)
+
+        self.emitter.emit_later('event:first', 1)
+        self.emitter.emit_later('event:second', 2)
+        self.assertEqual(self.order, [])
+        result = queue.drain()
+        self.assertEqual(self.order, [('event:first', 1), ('event:second', 2),
+                                      ('event:nested', 1)])
+        self.assertEqual(result.count, 3)
+        self.assertEqual(queue.stats(), {'depth': 0, 'max_depth': 2,
+                                         'enqueued': 3, 'dispatched': 3,
+                                         'dropped': 0})
+
+    def test_priority(self):
+        queue = self.emitter.event_queue = EventQueue()
+        self.emitter.emit_later('event:low', 1, priority=-1)
+        self.emitter.emit_later('event:normal', 2)
+        self.emitter.emit_later('event:high', 3, priority=1)
+        self.emitter.emit_later('event:normal', 4)
+        queue.drain(max_items=3)
+        self.assertEqual(self.order, [('event:high', 3), ('event:normal', 2),
+                                      ('event:normal', 4)])
+        self.assertEqual(len(queue), 1)
+
+    def test_overflow(self):
+        queue = self.emitter.event_queue = EventQueue(2, 'drop_newest')
+        for i in range(4):
+            self.emitter.emit_later('event:test', i)
+        queue.drain()
+        self.assertEqual(self.order, [('event:test', 0), ('event:test', 1)])
+        self.assertEqual(queue.dropped, 2)
+
+        del self.order[:]
+        queue = self.emitter.event_queue = EventQueue(2, 'drop_oldest')
+        self.emitter.emit_later('event:test', 0, priority=1)
+        for i in range(1, 4):
+            self.assertTrue(self.emitter.emit_later('event:test', i))
+        queue.drain()
+        self.assertEqual(self.order, [('event:test', 0), ('event:test', 3)])
+
+    def test_block(self):
+        queue = self.emitter.event_queue = EventQueue(1)
+        self.emitter.emit_later('event:test', 0)
+        self.assertRaises(EventQueueFull, self.emitter.emit_later,
+                          'event:test', 1, timeout=0.01)
+        thread = threading.Thread(target=self.emitter.emit_later,
+                                  args=('event:test', 2))
+        thread.start()
+        while not self.order:
+            queue.drain()
+        thread.join()
+        queue.drain()
+        self.assertEqual(self.order, [('event:test', 0), ('event:test', 2)])
+
+        @self.emitter.on('event:full')
+        def full(evt):
+            self.emitter.emit_later('event:test', 3)
+            self.emitter.emit_later('event:test', 4)
+
+        self.emitter.emit_later('event:full')
+        self.assertRaises(EventQueueFull, queue.drain)
+
+    def test_errors(self):
+        queue = self.emitter.event_queue = EventQueue()
+
+        @self.emitter.on('event:test')
+        def broken(evt):
+            if evt.data == 1:
+                raise KeyError()
+            return STOP
+
+        for i in range(3):
+            self.emitter.emit_later('event:test', i)
+        self.assertRaises(KeyError, queue.drain)
+        self.assertEqual(len(self.order), 3)
+        for i in range(3):
+            self.emitter.emit_later('event:test', i)
+        result = queue.drain(late_throw=False)
+        self.assertEqual(result.cancelled, [0, 2])
+        self.assertEqual([index for index, err in result.errors], [1])
+
+    def test_run(self):
+        queue = self.emitter.event_queue = EventQueue()
+        errors = []
+        thread = threading.Thread(target=queue.run, args=(errors.append,))
+        thread.start()
+        self.emitter.on('event:test', lambda evt: 1 / 0)
+        for i in range(10):
+            self.emitter.emit_later('event:test', i)
+        queue.close()
+        thread.join()
+        self.assertEqual(self.order, [('event:test', i) for i in range(10)])
+        self.assertEqual(len(errors), 10)
@@ -1,7 +1,13 @@
 
+import abc
+import gc
+import threading
+import time
 import unittest
 
-from dispatch import Emitter, EventData
+from dispatch import STOP, Emitter, EventData, TimerWheel, lazy, listen, \
+    transient
+from dispatch.events.emitter import SNAPSHOT_LIMIT
 
 
 class State(object):
@@ -118,3 +124,614 @@ class TestEvents(unittest.TestCase):
 
         emitter.fire('event:cancel')
         self.assertEqual(order, [1, 2, 5, 6])
+
+    def test_add_during_fire(self):
+        order = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:add')
+        def callback(evt):
+            order.append(1)
+
+            @emitter.on('event:add')
+            def callback_added(evt):
+                order.append(2)
+
+        emitter.fire('event:add')
+        self.assertEqual(order, [1])
+        emitter.fire('event:add')
+        self.assertEqual(order, [1, 1, 2])
+
+    def test_off_after_fire(self):
+        order = []
+
+        emitter = Emitter()
+
+        def callback(evt):
+            order.append(1)
+        emitter.on('event:off', callback)
+        emitter.fire('event:off')
+        emitter.off('event:off', callback)
+        emitter.fire('event:off')
+        self.assertEqual(order, [1])
+        with self.assertRaises(ValueError):
+            emitter.off('event:off', callback)
+
+    def test_errors_lazy(self):
+        evt = EventData('event:errors', None)
+        self.assertTrue(evt.success)
+        self.assertIsNone(evt._errors)
+        self.assertEqual(evt.errors, [])
+        evt.add_error(ValueError())
+        self.assertEqual(len(evt.errors), 1)
+        self.assertFalse(evt.success)
+        with self.assertRaises(AttributeError):
+            evt.extra = True
+
+    def test_errors_late_throw(self):
+        emitter = Emitter()
+
+        @emitter.on('event:error')
+        def callback(evt):
+            raise ValueError('first')
+
+        @emitter.on('event:error')
+        def callback(evt):
+            raise KeyError('second')
+
+        with self.assertRaises(ValueError):
+            emitter.fire('event:error')
+        evt = emitter.fire('event:error', late_throw=False)
+        self.assertEqual(len(evt.errors), 2)
+
+    def test_pooled(self):
+        seen = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:pooled')
+        @transient
+        def callback(evt):
+            seen.append((id(evt), evt.data))
+
+        self.assertIsNone(emitter.fire('event:pooled', 1, pooled=True))
+        emitter.fire('event:pooled', 2, pooled=True)
+        self.assertEqual(seen[0][0], seen[1][0])
+        self.assertEqual([data for _, data in seen], [1, 2])
+
+    def test_pooled_retained(self):
+        kept = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:pooled')
+        @transient
+        def callback(evt):
+            pass
+
+        @emitter.on('event:pooled')
+        def keep(evt):
+            kept.append(evt)
+
+        emitter.fire('event:pooled', 1, pooled=True)
+        emitter.fire('event:pooled', 2, pooled=True)
+        self.assertEqual([evt.data for evt in kept], [1, 2])
+        self.assertIsNot(kept[0], kept[1])
+
+    def test_fire_many(self):
+        seen = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:many')
+        def callback(evt):
+            if evt.data == 2:
+                evt.cancel()
+            if evt.data == 3:
+                raise ValueError(evt.data)
+            seen.append(evt.data)
+
+        @emitter.on('event:many')
+        def callback(evt):
+            seen.append(-evt.data)
+
+        result = emitter.fire_many('event:many', iter(range(5)),
+                                   late_throw=False)
+        self.assertEqual(result.count, 5)
+        self.assertEqual(result.cancelled, [2])
+        self.assertEqual([index for index, _ in result.errors], [3])
+        self.assertIsNone(result.events)
+        self.assertFalse(result.success)
+        self.assertEqual(seen, [0, 0, 1, -1, -3, 4, -4])
+        with self.assertRaises(ValueError):
+            emitter.fire_many('event:many', [3])
+
+    def test_fire_many_defer(self):
+        order = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:many')
+        def callback(evt):
+            evt.defer()
+            order.append(evt.data)
+
+        @emitter.on('event:many')
+        def callback(evt):
+            order.append(-evt.data)
+
+        result = emitter.fire_many('event:many', [1, 2], collect=True)
+        self.assertEqual(order, [-1, 1, -2, 2])
+        self.assertEqual([evt.data for evt in result.events], [1, 2])
+        self.assertTrue(result.success)
+
+    def test_fire_iter(self):
+        seen = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:iter')
+        def callback(evt):
+            seen.append(evt.data)
+
+        events = emitter.fire_iter('event:iter', range(3))
+        self.assertEqual(seen, [])
+        self.assertEqual(next(events).data, 0)
+        self.assertEqual(seen, [0])
+        self.assertEqual([evt.data for evt in events], [1, 2])
+        self.assertEqual(seen, [0, 1, 2])
+
+    def test_on_batch(self):
+        order = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:batch')
+        def callback(evt):
+            order.append('before')
+
+        batch = emitter.on_batch(
+            'event:batch', lambda events: order.append(
+                [evt.data for evt in events]), max_size=2)
+
+        @emitter.on('event:batch')
+        def callback(evt):
+            order.append('after')
+
+        emitter.fire('event:batch', 1)
+        emitter.fire('event:batch', 2)
+        emitter.fire('event:batch', 3)
+        self.assertEqual(order, ['before', 'after', 'before', [1, 2], 'after',
+                                 'before', 'after'])
+        self.assertEqual(batch.flush(), 1)
+        self.assertEqual(batch.flush(), 0)
+        self.assertEqual(order[-1], [3])
+
+    def test_on_batch_delay(self):
+        flushed = threading.Event()
+        batches = []
+
+        def handler(events):
+            batches.append([evt.data for evt in events])
+            flushed.set()
+
+        emitter = Emitter()
+        emitter.on_batch('event:batch', handler, max_delay=0.01)
+        emitter.fire('event:batch', 1)
+        emitter.fire('event:batch', 2)
+        self.assertTrue(flushed.wait(5))
+        self.assertEqual(batches, [[1, 2]])
+
+    def test_on_batch_cancel(self):
+        now = [0.0]
+        batches = []
+        emitter = Emitter()
+        emitter.timer_wheel = TimerWheel(tick=0.01, clock=lambda: now[0])
+        batch = emitter.on_batch(
+            'event:batch', lambda events: batches.append(
+                [evt.data for evt in events]), max_delay=0.1)
+        emitter.fire('event:batch', 1)
+        emitter.fire('event:batch', 2)
+        self.assertEqual(len(emitter.timer_wheel), 1)
+        batch.subscription.cancel()
+        self.assertEqual(batches, [[1, 2]])
+        self.assertEqual(len(emitter.timer_wheel), 0)
+        emitter.fire('event:batch', 3)
+        now[0] = 1
+        emitter.timer_wheel.advance()
+        self.assertEqual(batches, [[1, 2]])
+
+    def test_on_batch_threads(self):
+        state = State()
+        state.running = 0
+        state.overlaps = 0
+        delivered = []
+
+        def handler(events):
+            state.running += 1
+            if state.running > 1:
+                state.overlaps += 1
+            data = [evt.data for evt in events]
+            # Let a concurrent delivery overlap this one
+            time.sleep(0.0001)
+            delivered.extend(data)
+            state.running -= 1
+
+        emitter = Emitter()
+        batch = emitter.on_batch('event:batch', handler, max_size=5,
+                                 max_delay=0.001)
+
+        def fire(thread):
+            for i in range(200):
+                emitter.fire('event:batch', (thread, i))
+                if not i % 3:
+                    time.sleep(0.0005)
+
+        threads = [threading.Thread(target=fire, args=(thread,))
+                   for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batch.flush()
+        self.assertEqual(state.overlaps, 0)
+        self.assertEqual(len(delivered), 800)
+        for thread in range(4):
+            self.assertEqual([i for fired, i in delivered if fired == thread],
+                             list(range(200)))
+
+    def test_subscription_cancel(self):
+        order = []
+
+        emitter = Emitter()
+        sub1 = emitter.on('event:sub', lambda evt: order.append(1))
+        sub2 = emitter.on('event:sub', lambda evt: order.append(2))
+        emitter.fire('event:sub')
+        sub1.cancel()
+        sub1.cancel()
+        self.assertFalse(sub1.active)
+        self.assertTrue(sub2.active)
+        emitter.fire('event:sub')
+        self.assertEqual(order, [1, 2, 2])
+        self.assertEqual(emitter.event_handlers['event:sub'], [sub2])
+
+    def test_once(self):
+        order = []
+
+        emitter = Emitter()
+        subs = [emitter.once('event:once', lambda evt, i=i: order.append(i))
+                for i in range(1000)]
+
+        @emitter.once('event:once')
+        def callback(evt):
+            order.append('decorated')
+
+        subs[500].cancel()
+        emitter.fire('event:once')
+        self.assertEqual(len(order), 1000)
+        self.assertNotIn(500, order)
+        self.assertEqual(order[-1], 'decorated')
+        emitter.fire('event:once')
+        self.assertEqual(len(order), 1000)
+        self.assertNotIn('event:once', emitter.event_handlers)
+
+    def test_once_nested(self):
+        order = []
+
+        emitter = Emitter()
+
+        @emitter.once('event:once')
+        def callback(evt):
+            order.append(evt.data)
+            if evt.data == 1:
+                emitter.fire('event:once', 2)
+
+        emitter.fire('event:once', 1)
+        # Used up before it is called, so the nested fire skips it
+        self.assertEqual(order, [1])
+
+    def test_wildcard(self):
+        order = []
+
+        emitter = Emitter()
+        emitter.on('order:create', lambda evt: order.append('exact'))
+        emitter.on('order:*', lambda evt: order.append('order:*'))
+        emitter.on('**', lambda evt: order.append('**'))
+        emitter.on('order:**', lambda evt: order.append('order:**'))
+        emitter.on('*:create', lambda evt: order.append('*:create'))
+
+        emitter.fire('order:create')
+        self.assertEqual(order, ['exact', 'order:*', '**', 'order:**',
+                                 '*:create'])
+        del order[:]
+        emitter.fire('order:create:item')
+        self.assertEqual(order, ['**', 'order:**'])
+        del order[:]
+        emitter.fire('user:create')
+        self.assertEqual(order, ['**', '*:create'])
+
+    def test_wildcard_changes(self):
+        order = []
+
+        emitter = Emitter()
+        emitter.fire('order:create')
+
+        def callback(evt):
+            order.append(evt.name)
+        sub = emitter.on('order:*', callback)
+        emitter.fire('order:create')
+        emitter.fire('order:cancel')
+        sub.cancel()
+        emitter.fire('order:create')
+        emitter.on('order:*', callback)
+        emitter.fire('order:cancel')
+        emitter.off('order:*', callback)
+        emitter.fire('order:cancel')
+        self.assertEqual(order, ['order:create', 'order:cancel',
+                                 'order:cancel'])
+
+    def test_priority(self):
+        order = []
+
+        emitter = Emitter()
+        emitter.on('event:priority', lambda evt: order.append(1))
+        emitter.on('event:priority', lambda evt: order.append(2), priority=5)
+        emitter.once('event:priority', lambda evt: order.append(3),
+                     priority=5)
+        emitter.on('event:priority', lambda evt: order.append(4),
+                   priority=-1)
+
+        @emitter.on('event:priority', priority=10)
+        def callback(evt):
+            order.append(5)
+
+        emitter.on('order:*', lambda evt: order.append(6), priority=5)
+        emitter.fire('event:priority')
+        self.assertEqual(order, [5, 2, 3, 1, 4])
+        del order[:]
+        emitter.on('order:create', lambda evt: order.append(7))
+        emitter.fire('order:create')
+        self.assertEqual(order, [6, 7])
+
+    def test_stop(self):
+        order = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:stop')
+        def callback(evt):
+            order.append(1)
+            return STOP
+
+        @emitter.on('event:stop')
+        def callback(evt):
+            order.append(2)
+
+        evt = emitter.fire('event:stop')
+        self.assertTrue(evt.cancelled)
+        self.assertFalse(evt.success)
+        self.assertEqual(order, [1])
+
+    def test_phase(self):
+        order = []
+
+        emitter = Emitter()
+        emitter.on('event:phase', lambda evt: order.append('post'),
+                   phase='post')
+        emitter.on('event:phase', lambda evt: order.append('main'))
+        emitter.on('event:phase', lambda evt: order.append('pre'),
+                   phase='pre', priority=-10)
+        emitter.on('event:phase', lambda evt: order.append('post first'),
+                   phase='post', priority=1)
+        emitter.fire('event:phase')
+        self.assertEqual(order, ['pre', 'main', 'post first', 'post'])
+        with self.assertRaises(ValueError):
+            emitter.on('event:phase', lambda evt: None, phase='later')
+
+    def test_weak(self):
+        order = []
+
+        class Listener(object):
+            def callback(self, evt):
+                order.append(evt.data)
+
+        def callback(evt):
+            order.append(-evt.data)
+
+        emitter = Emitter()
+        listener = Listener()
+        sub = emitter.on('event:weak', listener.callback, weak=True)
+        func_sub = emitter.on('event:weak', callback, weak=True)
+        self.assertIs(sub.target().__self__, listener)
+        emitter.fire('event:weak', 1)
+        del listener
+        gc.collect()
+        self.assertFalse(sub.active)
+        emitter.fire('event:weak', 2)
+        del callback
+        gc.collect()
+        self.assertFalse(func_sub.active)
+        emitter.fire('event:weak', 3)
+        self.assertEqual(order, [1, -1, -2])
+        self.assertNotIn('event:weak', emitter.event_handlers)
+
+    def test_weak_churn(self):
+        class Listener(object):
+            def callback(self, evt):
+                pass
+
+        emitter = Emitter()
+        emitter.on('event:weak', lambda evt: None)
+        for i in range(1000):
+            emitter.on('event:weak', Listener().callback, weak=True)
+        gc.collect()
+        self.assertLessEqual(len(emitter.event_handlers['event:weak']), 2)
+
+    def test_cancel_churn(self):
+        emitter = Emitter()
+        emitter.on('reply:keep:*', lambda evt: None)
+        for i in range(10000):
+            emitter.on('reply:{0}:*'.format(i), lambda evt: None).cancel()
+            emitter.on('event:{0}'.format(i), lambda evt: None).cancel()
+        self.assertEqual(list(emitter._wildcards.children['reply'].children),
+                         ['keep'])
+        self.assertEqual(list(emitter.event_handlers), [])
+        emitter.on('reply:keep:*', lambda evt: None).cancel()
+        self.assertIn('reply', emitter._wildcards.children)
+
+    def test_snapshot_names(self):
+        emitter = Emitter()
+        emitter.on('event:test', lambda evt: None)
+        for i in range(5000):
+            emitter.fire('reply:{0}'.format(i))
+        self.assertLessEqual(len(emitter._snapshots), SNAPSHOT_LIMIT)
+        emitter.on('reply:*', lambda evt: None)
+        for i in range(5000):
+            emitter.fire('reply:{0}'.format(i))
+        self.assertLessEqual(len(emitter._snapshots), SNAPSHOT_LIMIT)
+
+    def test_snapshot_names_class(self):
+        class Replier(Emitter):
+            @listen('request')
+            def handler(self, evt):
+                pass
+
+        for i in range(5000):
+            Replier().fire('reply:{0}'.format(i))
+            Emitter().fire('reply:{0}'.format(i))
+        self.assertLessEqual(len(Replier._snapshots), SNAPSHOT_LIMIT)
+        self.assertLessEqual(len(Emitter._snapshots), SNAPSHOT_LIMIT)
+
+    def test_listen(self):
+        order = []
+
+        class Base(Emitter):
+            @listen('event:listen')
+            def first(self, evt):
+                order.append(('first', self.name))
+
+            @listen('event:*', priority=1)
+            def any_event(self, evt):
+                order.append(('any', self.name))
+
+            @listen('event:listen')
+            def replaced(self, evt):
+                order.append('replaced')
+
+        class Child(Base):
+            def replaced(self, evt):
+                pass
+
+            @listen('event:listen')
+            def second(self, evt):
+                order.append(('second', self.name))
+
+        child1 = Child()
+        child1.name = 1
+        child2 = Child()
+        child2.name = 2
+        child1.fire('event:listen')
+        self.assertEqual(order, [('any', 1), ('first', 1), ('second', 1)])
+        self.assertFalse(hasattr(child1, 'event_handlers'))
+        self.assertIs(child1._snapshots, Child._snapshots)
+
+        del order[:]
+        child2.on('event:listen', lambda evt: order.append('own'),
+                  priority=1)
+        child2.on('event:listen', lambda evt: order.append('own last'))
+        child2.fire('event:listen')
+        child1.fire('event:listen')
+        self.assertEqual(order, [('any', 2), 'own', ('first', 2),
+                                 ('second', 2), 'own last',
+                                 ('any', 1), ('first', 1), ('second', 1)])
+
+        del order[:]
+        child2.all_off()
+        child2.fire('event:listen')
+        self.assertEqual(order, [('any', 2), ('first', 2), ('second', 2)])
+
+        del order[:]
+        base = Base()
+        base.name = 3
+        base.fire('event:listen')
+        self.assertEqual(order, [('any', 3), ('first', 3), 'replaced'])
+
+    def test_listen_subclass_later(self):
+        order = []
+
+        class Base(Emitter):
+            @listen('event:listen')
+            def first(self, evt):
+                order.append('first')
+
+        Base().fire('event:listen')
+
+        class Child(Base):
+            @listen('event:listen')
+            def second(self, evt):
+                order.append('second')
+
+        Child().fire('event:listen')
+        Base().fire('event:listen')
+        self.assertEqual(order, ['first', 'first', 'second', 'first'])
+
+    def test_listen_metaclass(self):
+        order = []
+
+        class Handler(Emitter):
+            __metaclass__ = abc.ABCMeta
+
+            @abc.abstractmethod
+            def handle(self, evt):
+                pass
+
+            @listen('event:listen')
+            def on_listen(self, evt):
+                self.handle(evt)
+
+        class Concrete(Handler):
+            def handle(self, evt):
+                order.append(evt.data)
+
+        self.assertRaises(TypeError, Handler)
+        Concrete().fire('event:listen', 1)
+        self.assertEqual(order, [1])
+
+    def test_has_listeners(self):
+        class Listened(Emitter):
+            @listen('event:class')
+            def handler(self, evt):
+                pass
+
+        emitter = Emitter()
+        self.assertFalse(emitter.has_listeners('event:test'))
+        subscription = emitter.on('event:test', lambda evt: None)
+        self.assertTrue(emitter.has_listeners('event:test'))
+        subscription.cancel()
+        self.assertFalse(emitter.has_listeners('event:test'))
+        emitter.on('event:*', lambda evt: None)
+        self.assertTrue(emitter.has_listeners('event:test'))
+        self.assertFalse(emitter.has_listeners('other'))
+        self.assertTrue(Listened().has_listeners('event:class'))
+
+    def test_lazy(self):
+        emitter = Emitter()
+        calls = []
+
+        def payload():
+            calls.append(None)
+            return 'payload'
+
+        evt = emitter.fire('event:test', lazy(payload))
+        self.assertEqual(calls, [])
+        self.assertIsInstance(evt.data, lazy)
+
+        received = []
+        emitter.on('event:test', lambda evt: received.append(evt.data))
+        emitter.on('event:test', lambda evt: received.append(evt.data))
+        data = lazy(payload)
+        self.assertEqual(emitter.fire('event:test', data).data, 'payload')
+        emitter.fire('event:test', data)
+        self.assertEqual(received, ['payload'] * 4)
+        self.assertEqual(calls, [None])
@@ -0,0 +1,181 @@
+import threading
+import time
+import unittest
+
+try:
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = ThreadPoolExecutor = None
+
+from dispatch import STOP, Emitter
+
+
+def square(evt):
+    return evt.data * evt.data
+
+
+def fail(evt):
+    raise ValueError(evt.data)
+
+
+def cancel(evt):
+    evt.cancel()
+
+
+def stop(evt):
+    return STOP
+
+
+@unittest.skipIf(ThreadPoolExecutor is None,
+                 'concurrent.futures is not available')
+class TestExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def wait(self, promise):
+        """Wait for promise, whether or not the executor still runs"""
+        for i in range(500):
+            if promise.finished:
+                break
+            time.sleep(0.01)
+        self.assertTrue(promise.finished)
+
+    def test_threads(self):
+        barrier = threading.Event()
+        seen = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:pool')
+        def waits(evt):
+            # Only finishes when the other handler runs alongside it
+            self.assertTrue(barrier.wait(5))
+            seen.append('waits')
+
+        @emitter.on('event:pool')
+        def releases(evt):
+            barrier.set()
+            seen.append('releases')
+
+        promise = emitter.fire('event:pool', 1, executor=self.executor)
+        self.executor.shutdown(wait=True)
+        self.assertTrue(promise.succeeded)
+        self.assertEqual(promise.value.data, 1)
+        self.assertEqual(sorted(seen), ['releases', 'waits'])
+
+    def test_errors(self):
+        emitter = Emitter()
+        emitter.on('event:pool', fail)
+        emitter.on('event:pool', square)
+        promise = emitter.fire('event:pool', 3, executor=self.executor)
+        self.executor.shutdown(wait=True)
+        self.assertTrue(promise.finished)
+        self.assertFalse(promise.succeeded)
+        self.assertIsInstance(promise.exception, ValueError)
+
+        promise = Emitter().fire('event:pool', executor=self.executor)
+        self.assertTrue(promise.succeeded)
+
+    def test_defer(self):
+        order = []
+
+        emitter = Emitter()
+
+        @emitter.on('event:pool')
+        def deferred(evt):
+            evt.defer()
+            order.append('deferred')
+
+        @emitter.on('event:pool')
+        def normal(evt):
+            order.append('normal')
+
+        promise = emitter.fire('event:pool', executor=self.executor,
+                               late_throw=False)
+        self.wait(promise)
+        self.assertEqual(order, ['normal', 'deferred'])
+        self.assertTrue(promise.value.deferred)
+
+    def test_shutdown(self):
+        emitter = Emitter()
+        emitter.on('event:pool', square)
+        self.executor.shutdown()
+        promise = emitter.fire('event:pool', 2, executor=self.executor,
+                               late_throw=False)
+        self.wait(promise)
+        self.assertFalse(promise.succeeded)
+        self.assertIsInstance(promise.exception, RuntimeError)
+
+        self.executor = ThreadPoolExecutor(4)
+        emitter = Emitter()
+
+        @emitter.on('event:pool')
+        def deferred(evt):
+            if not evt.deferred:
+                self.executor.shutdown(wait=False)
+                evt.defer()
+
+        promise = emitter.fire('event:pool', executor=self.executor)
+        self.wait(promise)
+        self.assertFalse(promise.succeeded)
+        self.assertIsInstance(promise.exception, RuntimeError)
+
+    def test_processes(self):
+        executor = ProcessPoolExecutor(2)
+        self.addCleanup(executor.shutdown)
+        emitter = Emitter()
+        emitter.on('event:pool', square)
+        promise = emitter.fire('event:pool', 4, executor=executor)
+        executor.shutdown(wait=True)
+        self.assertTrue(promise.succeeded)
+        self.assertEqual(promise.value.data, 4)
+
+
+@unittest.skipIf(ProcessPoolExecutor is None,
+                 'concurrent.futures is not available')
+class TestProcesses(unittest.TestCase):
+    def setUp(self):
+        self.executor = ProcessPoolExecutor(2)
+        self.addCleanup(self.executor.shutdown)
+        self.emitter = Emitter()
+
+    def fire(self, data=None):
+        promise = self.emitter.fire('event:pool', data,
+                                    executor=self.executor, late_throw=False)
+        self.executor.shutdown(wait=True)
+        self.assertTrue(promise.finished)
+        self.executor = ProcessPoolExecutor(2)
+        self.addCleanup(self.executor.shutdown)
+        return promise.value
+
+    def test_once(self):
+        subscription = self.emitter.once('event:pool', fail)
+        evt = self.fire(1)
+        self.assertFalse(subscription.active)
+        self.assertIsInstance(evt.errors[0][1], ValueError)
+        self.assertEqual(self.fire(2).errors, [])
+
+    def test_cancel(self):
+        self.emitter.on('event:pool', cancel)
+        evt = self.fire()
+        self.assertTrue(evt.cancelled)
+        self.assertEqual(evt.errors, [])
+
+    def test_stop(self):
+        self.emitter.on('event:pool', stop)
+        self.assertTrue(self.fire().cancelled)
+
+    def test_unpicklable(self):
+        self.emitter.on('event:pool', lambda evt: None)
+        with self.assertRaises(ValueError):
+            self.emitter.fire('event:pool', executor=self.executor)
+
+        emitter = Emitter()
+        subscription = emitter.once('event:pool', square)
+        emitter.on('event:pool', square, throttle=1)
+        with self.assertRaises(ValueError):
+            emitter.fire('event:pool', executor=self.executor)
+        self.assertTrue(subscription.active)
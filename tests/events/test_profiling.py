@@ -0,0 +1,162 @@
+import unittest
+
+from dispatch import Emitter, FastPromise, Profiler
+from dispatch.events.aio import asyncio
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Profiled(Emitter):
+    pass
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.slow = []
+        self.profiler = Profiler(
+            slow=0.5, clock=self.clock,
+            on_slow=lambda evt, name, elapsed: self.slow.append(
+                (evt.name, name, elapsed))).enable(Profiled)
+
+    def tearDown(self):
+        self.profiler.disable(Profiled)
+
+    def test_stats(self):
+        emitter = Profiled()
+
+        def fast(evt):
+            self.clock.now += 0.001
+
+        def slow(evt):
+            self.clock.now += 2
+
+        def broken(evt):
+            raise ValueError()
+
+        def deferred(evt):
+            if not evt.deferred:
+                evt.defer()
+
+        emitter.on('event', fast)
+        emitter.once('event', slow)
+        emitter.on('event', broken)
+        emitter.on('event', deferred)
+        emitter.fire('event', late_throw=False)
+        emitter.fire('event', late_throw=False)
+        Emitter().on('event', fast).emitter.fire('event')
+
+        dump = self.profiler.dump()
+        self.assertEqual(dump['buckets'], list(self.profiler.buckets))
+        stats = dump['events']['event']
+        prefix = __name__ + '.'
+        self.assertEqual(stats[prefix + 'fast']['calls'], 2)
+        self.assertEqual(stats[prefix + 'fast']['histogram'],
+                         [0, 0, 2, 0, 0, 0, 0])
+        self.assertEqual(stats[prefix + 'slow']['calls'], 1)
+        self.assertEqual(stats[prefix + 'slow']['max'], 2)
+        self.assertEqual(stats[prefix + 'slow']['histogram'][-1], 1)
+        self.assertEqual(stats[prefix + 'broken']['errors'], 2)
+        self.assertEqual(stats[prefix + 'deferred']['calls'], 4)
+        self.assertEqual(stats[prefix + 'deferred']['errors'], 0)
+        self.assertEqual(self.slow, [('event', prefix + 'slow', 2)])
+
+        self.profiler.reset()
+        self.assertEqual(self.profiler.dump()['events'], {})
+        self.profiler.disable(Profiled)
+        emitter.fire('event', late_throw=False)
+        self.assertEqual(self.profiler.dump()['events'], {})
+
+    def test_lambdas(self):
+        emitter = Profiled()
+        emitter.on('event', lambda evt: None)
+        emitter.on('event', lambda evt: None)
+        for i in range(3):
+            emitter.once('event', lambda evt: None)
+            emitter.fire('event')
+
+        stats = self.profiler.dump()['events']['event']
+        self.assertEqual(len(stats), 3)
+        for name in stats:
+            self.assertTrue(name.startswith(__name__ + '.<lambda>:'))
+            self.assertEqual(stats[name]['calls'], 3)
+
+    @unittest.skipIf(asyncio is None, 'asyncio is not available')
+    def test_async(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        def awaited(evt):
+            future = asyncio.Future(loop=loop)
+
+            def finish():
+                self.clock.now += 2
+                future.set_result(None)
+            loop.call_soon(finish)
+            return future
+
+        def broken(evt):
+            future = asyncio.Future(loop=loop)
+            future.set_exception(KeyError())
+            return future
+
+        emitter = Profiled()
+        emitter.on('event', awaited)
+        emitter.on('event', broken, priority=1)
+        loop.run_until_complete(emitter.fire_async('event', loop=loop,
+                                                   late_throw=False))
+
+        stats = self.profiler.dump()['events']['event']
+        prefix = __name__ + '.'
+        self.assertEqual(stats[prefix + 'awaited']['max'], 2)
+        self.assertEqual(stats[prefix + 'broken']['errors'], 1)
+        self.assertEqual(stats[prefix + 'broken']['max'], 0)
+        self.assertEqual(self.slow, [('event', prefix + 'awaited', 2)])
+
+    def test_methods(self):
+        class Handler(object):
+            def handle(self, evt):
+                pass
+
+        emitter = Profiled()
+        handler = Handler()
+        emitter.on('event', handler.handle, weak=True)
+        emitter.fire('event')
+        self.assertEqual(list(self.profiler.dump()['events']['event']),
+                         [__name__ + '.Handler.handle'])
+
+    def test_promise(self):
+        profiler = Profiler(clock=self.clock).enable()
+        try:
+            promise = FastPromise()
+            promise.success(lambda evt: None)
+            promise.done()
+        finally:
+            profiler.disable()
+        self.assertIsNone(Emitter.profiler)
+        self.assertEqual(
+            profiler.dump()['events']['success'][__name__ + '.<lambda>']
+            ['calls'], 1)
+
+    def test_function(self):
+        calls = []
+
+        def profile(evt, callback):
+            calls.append(evt.name)
+            return callback(evt)
+
+        class Traced(Emitter):
+            profiler = profile
+
+        emitter = Traced()
+        emitter.on('event', lambda evt: None)
+        emitter.fire('event')
+        Traced.profiler = profile
+        emitter.fire('event')
+        self.assertEqual(calls, ['event', 'event'])
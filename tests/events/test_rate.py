@@ -0,0 +1,101 @@
+import unittest
+
+from dispatch import Emitter, TimerWheel
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimit(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.emitter = Emitter()
+        self.emitter.timer_wheel = TimerWheel(tick=0.01, clock=self.clock)
+        self.calls = []
+
+    def handler(self, evt):
+        self.calls.append((evt.name, evt.data))
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        self.emitter.timer_wheel.advance()
+
+    def test_debounce(self):
+        self.emitter.on('event:*', self.handler, debounce=0.1)
+        for i in range(10):
+            self.emitter.fire('event:{0}'.format(i), i)
+            self.advance(0.05)
+        self.assertEqual(self.calls, [])
+        self.advance(0.05)
+        self.assertEqual(self.calls, [('event:9', 9)])
+        self.advance(1)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(self.emitter.timer_wheel), 0)
+
+    def test_throttle(self):
+        self.emitter.on('event', self.handler, throttle=1)
+        for i in range(100):
+            self.emitter.fire('event', i)
+        self.assertEqual(self.calls, [('event', 0)])
+        self.advance(0.5)
+        self.assertEqual(len(self.calls), 1)
+        self.advance(0.5)
+        self.assertEqual(self.calls, [('event', 0), ('event', 99)])
+        self.advance(1)
+        self.emitter.fire('event', 100)
+        self.assertEqual(self.calls[-1], ('event', 100))
+
+    def test_coalesce(self):
+        self.emitter.on('event', self.handler, throttle=1,
+                        coalesce=lambda total, count: total + count)
+        for count in range(1, 5):
+            self.emitter.fire('event', count)
+        self.advance(1)
+        self.assertEqual(self.calls, [('event', 1), ('event', 9)])
+
+    def test_coalesce_initial(self):
+        self.emitter.on('event', self.handler, debounce=0.1,
+                        coalesce=(set, lambda keys, key: keys | {key}))
+        for key in 'abca':
+            self.emitter.fire('event', key)
+        self.advance(0.1)
+        self.assertEqual(self.calls, [('event', set('abc'))])
+
+        del self.calls[:]
+        self.emitter.on('other', self.handler, throttle=1,
+                        coalesce=(list, lambda keys, key: keys + [key]))
+        for key in 'abcd':
+            self.emitter.fire('other', key)
+        self.advance(1)
+        self.assertEqual(self.calls, [('other', ['a']),
+                                      ('other', ['b', 'c', 'd'])])
+
+    def test_cancel(self):
+        subscription = self.emitter.on('event', self.handler, debounce=0.1)
+        self.emitter.fire('event')
+        subscription.cancel()
+        self.advance(1)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(len(self.emitter.timer_wheel), 0)
+
+    def test_decorator(self):
+        @self.emitter.on('event', throttle=1)
+        def handler(evt):
+            self.calls.append(evt.data)
+
+        self.emitter.fire('event', 1)
+        self.emitter.fire('event', 2)
+        self.emitter.off('event', handler)
+        self.advance(1)
+        self.assertEqual(self.calls, [1])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, self.emitter.on, 'event', self.handler,
+                          debounce=1, throttle=1)
+        self.assertRaises(ValueError, self.emitter.on, 'event', self.handler,
+                          coalesce=max)
@@ -0,0 +1,86 @@
+import gc
+import threading
+import unittest
+
+from dispatch import Emitter, EventQueueFull, StreamClosed
+from dispatch.events.aio import asyncio
+
+
+class TestStream(unittest.TestCase):
+    def setUp(self):
+        self.emitter = Emitter()
+
+    def active(self, event):
+        return [sub for sub in self.emitter.event_handlers.get(event, ())
+                if sub.active]
+
+    def test_iterate(self):
+        stream = self.emitter.stream('event:*')
+        for i in range(3):
+            self.emitter.fire('event:test', i)
+        self.emitter.fire('other')
+        stream.close()
+        self.emitter.fire('event:test', 3)
+        self.assertEqual([evt.data for evt in stream], [0, 1, 2])
+        self.assertFalse(self.emitter.has_listeners('event:test'))
+
+    def test_thread(self):
+        stream = self.emitter.stream('event', maxsize=2, data_only=True)
+        received = []
+
+        def consume():
+            for data in stream:
+                received.append(data)
+
+        thread = threading.Thread(target=consume)
+        thread.start()
+        for i in range(100):
+            self.emitter.fire('event', i)
+        stream.close()
+        thread.join()
+        self.assertEqual(received, range(100))
+
+    def test_policies(self):
+        stream = self.emitter.stream('event', 2, 'drop_oldest', True)
+        for i in range(5):
+            self.emitter.fire('event', i)
+        stream.close()
+        self.assertEqual(list(stream), [3, 4])
+        self.assertEqual(stream.dropped, 3)
+
+        stream = self.emitter.stream('event', 2, 'drop_newest', True)
+        for i in range(5):
+            self.emitter.fire('event', i)
+        stream.close()
+        self.assertEqual(list(stream), [0, 1])
+
+        with self.emitter.stream('event', 1, data_only=True) as stream:
+            self.emitter.fire('event', 0)
+            self.assertEqual(next(stream), 0)
+            self.emitter.fire('event', 1)
+            # Blocking would wait for this thread itself
+            self.assertRaises(EventQueueFull, self.emitter.fire, 'event', 2)
+        self.assertEqual(list(stream), [1])
+
+    def test_garbage_collected(self):
+        stream = self.emitter.stream('event')
+        self.assertEqual(len(self.active('event')), 1)
+        del stream
+        gc.collect()
+        self.assertEqual(self.active('event'), [])
+        self.emitter.fire('event')
+
+    @unittest.skipIf(asyncio is None, 'asyncio is not available')
+    def test_async(self):
+        loop = asyncio.new_event_loop()
+        stream = self.emitter.stream('event', data_only=True)
+        self.emitter.fire('event', 0)
+        first = stream.get_async(loop)
+        second = stream.get_async(loop)
+        loop.call_soon(self.emitter.fire, 'event', 1)
+        loop.call_soon(stream.close)
+        self.assertEqual(loop.run_until_complete(first), 0)
+        self.assertEqual(loop.run_until_complete(second), 1)
+        self.assertRaises(StreamClosed, loop.run_until_complete,
+                          stream.get_async(loop))
+        loop.close()
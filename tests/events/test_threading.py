@@ -0,0 +1,119 @@
+import sys
+import threading
+import time
+import unittest
+
+from dispatch import ThreadSafeEmitter
+
+
+class TestThreadSafeEmitter(unittest.TestCase):
+    def setUp(self):
+        self.interval = sys.getcheckinterval()
+        # Switch threads as often as possible to shake out races
+        sys.setcheckinterval(1)
+
+    def tearDown(self):
+        sys.setcheckinterval(self.interval)
+
+    def test_fresh_subscribe(self):
+        for attempt in range(50):
+            emitter = ThreadSafeEmitter()
+            seen = []
+            start = threading.Event()
+
+            def subscribe(i):
+                start.wait()
+                emitter.on('event:fresh', lambda evt: seen.append(i))
+            threads = [threading.Thread(target=subscribe, args=(i,))
+                       for i in range(4)]
+            for thread in threads:
+                thread.start()
+            start.set()
+            for thread in threads:
+                thread.join()
+            emitter.fire('event:fresh')
+            self.assertEqual(sorted(seen), [0, 1, 2, 3])
+
+    def test_once(self):
+        for attempt in range(50):
+            emitter = ThreadSafeEmitter()
+            calls = []
+            start = threading.Event()
+
+            @emitter.once('event:once')
+            def callback(evt):
+                # Give the other threads time to reach the handler
+                time.sleep(0.001)
+                calls.append(evt.data)
+
+            def fire(i):
+                start.wait()
+                emitter.fire('event:once', i)
+            threads = [threading.Thread(target=fire, args=(i,))
+                       for i in range(4)]
+            for thread in threads:
+                thread.start()
+            start.set()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(calls), 1)
+
+    def test_stress(self):
+        emitter = ThreadSafeEmitter()
+        errors = []
+        counts = {}
+        stop = threading.Event()
+
+        once_calls = []
+        once_count = [0]
+
+        def keep(evt):
+            counts[evt.data] = counts.get(evt.data, 0) + 1
+        emitter.on('event:stress', keep)
+
+        def churn(thread):
+            try:
+                count = 0
+                while not stop.is_set():
+                    subs = [emitter.on('event:stress', lambda evt: None)
+                            for i in range(10)]
+                    emitter.once('event:stress',
+                                 lambda evt, key=(thread, count):
+                                     once_calls.append(key))
+                    count += 1
+                    emitter.on('event:*', lambda evt: None).cancel()
+                    for sub in subs:
+                        sub.cancel()
+                once_count[0] += count
+            except Exception as err:
+                errors.append(err)
+
+        def fire(name):
+            try:
+                for i in range(2000):
+                    emitter.fire('event:stress', name)
+            except Exception as err:
+                errors.append(err)
+
+        churners = [threading.Thread(target=churn, args=(i,))
+                    for i in range(3)]
+        firers = [threading.Thread(target=fire, args=(i,)) for i in range(3)]
+        for thread in churners + firers:
+            thread.start()
+        for thread in firers:
+            thread.join()
+        stop.set()
+        for thread in churners:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(counts, {0: 2000, 1: 2000, 2: 2000})
+        emitter.fire('event:stress', 3)
+        emitter.fire('event:stress', 3)
+        self.assertEqual(counts[3], 2)
+        # Every once handler ran exactly once
+        self.assertEqual(len(once_calls), once_count[0])
+        self.assertEqual(len(set(once_calls)), once_count[0])
+        self.assertEqual(
+            [sub.callback for sub in emitter.event_handlers['event:stress']],
+            [keep])
@@ -0,0 +1,99 @@
+import random
+import threading
+import unittest
+
+from dispatch import TimerWheel
+from dispatch.events.aio import asyncio
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTimerWheel(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.wheel = TimerWheel(tick=1, slots=4, levels=3, clock=self.clock)
+        self.fired = []
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        return self.wheel.advance()
+
+    def test_schedule(self):
+        self.wheel.schedule(2.5, self.fired.append, 'a')
+        self.wheel.schedule(1, self.fired.append, 'b')
+        self.assertEqual(len(self.wheel), 2)
+        self.assertEqual(self.advance(1), 1)
+        self.assertEqual(self.fired, ['b'])
+        self.advance(1)
+        self.assertEqual(self.fired, ['b'])
+        self.advance(1)
+        self.assertEqual(self.fired, ['b', 'a'])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_cancel(self):
+        timer = self.wheel.schedule(3, self.fired.append, 'a')
+        self.assertTrue(timer.active)
+        timer.cancel()
+        timer.cancel()
+        self.assertFalse(timer.active)
+        self.assertEqual(len(self.wheel), 0)
+        self.advance(10)
+        self.assertEqual(self.fired, [])
+
+    def test_levels(self):
+        # Spans every level and past the 64 ticks the wheel covers
+        delays = range(1, 200) * 2
+        random.shuffle(delays)
+        for delay in delays:
+            self.wheel.schedule(delay, self.fired.append, delay)
+        self.advance(0.5)
+        for second in range(1, 200):
+            self.advance(1)
+            self.assertEqual(self.fired, [second, second])
+            del self.fired[:]
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_skip(self):
+        self.wheel.schedule(5, self.fired.append, 'a')
+        self.wheel.schedule(100, self.fired.append, 'b')
+        self.advance(50)
+        self.assertEqual(self.fired, ['a'])
+        self.advance(60)
+        self.assertEqual(self.fired, ['a', 'b'])
+        self.wheel.schedule(1, self.fired.append, 'c')
+        self.advance(1)
+        self.assertEqual(self.fired, ['a', 'b', 'c'])
+
+    def test_errors(self):
+        def broken():
+            raise KeyError()
+
+        self.wheel.schedule(1, broken)
+        self.wheel.schedule(1, self.fired.append, 'a')
+        self.assertRaises(KeyError, self.advance, 1)
+        self.assertEqual(self.fired, ['a'])
+
+    def test_thread(self):
+        wheel = TimerWheel(tick=0.001).start()
+        fired = threading.Event()
+        wheel.schedule(0.01, fired.set)
+        self.assertTrue(fired.wait(5))
+        wheel.stop()
+
+    @unittest.skipIf(asyncio is None, 'asyncio is not available')
+    def test_loop(self):
+        loop = asyncio.new_event_loop()
+        wheel = TimerWheel(tick=0.001).attach(loop)
+        wheel.schedule(0.01, loop.stop)
+        loop.call_later(5, loop.stop)
+        loop.run_forever()
+        self.assertEqual(len(wheel), 0)
+        wheel.stop()
+        loop.close()
+
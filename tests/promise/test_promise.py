@@ -1,7 +1,12 @@
 
+import gc
+import time
 import unittest
+import weakref
 
-from dispatch import Promise
+from dispatch import FastPromise, Promise, PromiseCancelled, PromiseFailed, \
+    PromiseTimeout, TimerWheel
+from dispatch.events.aio import asyncio
 
 
 class State(object):
@@ -47,6 +52,42 @@ class TestPromise(unittest.TestCase):
         self.assertEqual(state.success, 0)
         self.assertEqual(state.failure, 1)
 
+    def test_done_reentrant(self):
+        for cls in (Promise, FastPromise):
+            promise = cls()
+            log = []
+
+            @promise.success
+            def success(evt):
+                log.append('success')
+                promise.throw(ValueError())
+                self.assertFalse(promise.cancel())
+
+            promise.failure(lambda evt: log.append('failure'))
+            promise.complete(lambda evt: log.append('complete'))
+            promise.done(1)
+            self.assertEqual(log, ['success', 'complete'])
+            self.assertTrue(promise.succeeded)
+            self.assertIsNone(promise.exception)
+
+    def test_errors(self):
+        promise = Promise()
+        calls = []
+
+        def broken(evt):
+            raise KeyError()
+
+        promise.success(broken)
+        promise.complete(lambda evt: calls.append('complete'))
+        chained = promise.then(lambda value: 'chained')
+        combined = Promise.all(promise)
+        self.assertRaises(KeyError, promise.done)
+        self.assertEqual(calls, ['complete'])
+        self.assertTrue(promise.finished)
+        self.assertFalse(hasattr(promise, 'event_handlers'))
+        self.assertEqual(chained.value, 'chained')
+        self.assertTrue(combined.finished)
+
     def test_complete(self):
         promise = Promise()
         state = State()
@@ -248,3 +289,373 @@ class TestPromise(unittest.TestCase):
         promise2.fail()
         self.assertEqual(state.success, 0)
         self.assertEqual(state.failure, 1)
+
+    def test_no_once_after_done(self):
+        promise = Promise()
+        promise.done()
+
+        with self.assertRaises(RuntimeError):
+            promise.once('success', lambda evt: None)
+
+    @unittest.skipIf(asyncio is None, 'asyncio is not available')
+    def test_future(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        promise = Promise()
+        future = promise.future(loop)
+        loop.call_soon(promise.done, 5)
+        self.assertEqual(loop.run_until_complete(future), 5)
+        self.assertEqual(loop.run_until_complete(promise.future(loop)), 5)
+
+        promise = Promise()
+        future = promise.future(loop)
+        loop.call_soon(promise.throw, KeyError('failed'))
+        with self.assertRaises(KeyError):
+            loop.run_until_complete(future)
+
+        promise = Promise()
+        promise.fail('data')
+        with self.assertRaises(PromiseFailed) as context:
+            loop.run_until_complete(promise.future(loop))
+        self.assertEqual(context.exception.data, 'data')
+
+    def test_all_results(self):
+        promises = [Promise() for i in range(5)]
+        promise = Promise.all(*promises)
+        for i in reversed(range(5)):
+            self.assertFalse(promise.finished)
+            promises[i].done(i * 10)
+        self.assertTrue(promise.succeeded)
+        self.assertEqual(promise.value, [0, 10, 20, 30, 40])
+        self.assertTrue(Promise.all().succeeded)
+
+    def test_all_throw(self):
+        promise1 = Promise()
+        promise2 = Promise()
+        promise = Promise.all(promise1, promise2, throw_error=True)
+        promise1.throw(KeyError())
+        self.assertTrue(promise.finished)
+        self.assertIsInstance(promise.exception, KeyError)
+
+    def test_any_results(self):
+        promises = [Promise() for i in range(3)]
+        promise = Promise.any(*promises)
+        promises[2].fail('c')
+        promises[0].fail('a')
+        self.assertFalse(promise.finished)
+        promises[1].fail('b')
+        self.assertFalse(promise.succeeded)
+        self.assertEqual(promise.value, ['a', 'b', 'c'])
+
+        promises = [Promise() for i in range(3)]
+        promise = Promise.any(*promises)
+        promises[1].done('b')
+        self.assertEqual(promise.value, 'b')
+
+    def test_then_error(self):
+        first = Promise()
+        other = Promise()
+        log = []
+        other.then(log.append)
+
+        def broken(evt):
+            raise KeyError()
+
+        chained = first.then(other.done)
+        chained.success(broken)
+        self.assertRaises(KeyError, first.done, 1)
+        # The step of the other chain ran before the error came out
+        self.assertEqual(log, [1])
+        later = Promise()
+        later.then(log.append)
+        later.done(2)
+        self.assertEqual(log, [1, 2])
+
+    def test_all_any_release(self):
+        for cls in (Promise, FastPromise):
+            first = cls()
+            second = cls()
+            ref = weakref.ref(second)
+            combined = cls.any(first, second)
+            first.done(1)
+            self.assertIsNone(combined.waiting_for)
+            del second
+            gc.collect()
+            self.assertIsNone(ref())
+
+            first = cls()
+            combined = cls.all(first)
+            combined.fail()
+            self.assertIsNone(combined.waiting_for)
+            if cls is Promise:
+                self.assertFalse(first.has_listeners('complete'))
+            else:
+                self.assertIsNone(first._on_complete)
+
+    def test_then(self):
+        promise = Promise()
+        results = []
+        chained = promise.then(lambda data: data + 1).then(
+            lambda data: data * 2)
+        chained.success(lambda evt: results.append(evt.data))
+        promise.done(1)
+        self.assertEqual(results, [4])
+        self.assertEqual(chained.then(lambda data: data + 1).value, 5)
+
+    def test_then_failure(self):
+        promise = Promise()
+
+        def fails(data):
+            raise KeyError(data)
+        chained = promise.then(fails)
+        skipped = chained.then(lambda data: 'skipped')
+        recovered = skipped.then(None, lambda err: 'recovered')
+        promise.done(1)
+        self.assertIsInstance(chained.exception, KeyError)
+        self.assertFalse(skipped.succeeded)
+        self.assertIs(skipped.exception, chained.exception)
+        self.assertEqual(recovered.value, 'recovered')
+
+        failed = Promise()
+        failed.fail('data')
+        self.assertEqual(failed.then(None, lambda data: data).value, 'data')
+
+    def test_then_flatten(self):
+        promise = Promise()
+        inner = Promise()
+        chained = promise.then(lambda data: inner)
+        promise.done()
+        self.assertFalse(chained.finished)
+        inner.done('inner')
+        self.assertEqual(chained.value, 'inner')
+
+    def test_then_deep(self):
+        promise = Promise()
+        chained = promise
+        for i in range(10000):
+            chained = chained.then(lambda data: data + 1)
+        promise.done(0)
+        self.assertEqual(chained.value, 10000)
+
+        inner = Promise()
+        chained = inner
+        for i in range(10000):
+            chained = chained.then(lambda data: Promise.all())
+        inner.done()
+        self.assertTrue(chained.succeeded)
+
+    def test_timeout(self):
+        now = [0.0]
+        wheel = TimerWheel(tick=1, clock=lambda: now[0])
+        for cls in (Promise, FastPromise):
+            late = cls()
+            self.assertIs(late.timeout(5, wheel), late)
+            errors = []
+            late.error(lambda evt: errors.append(evt.data))
+            kept = cls().timeout(5, wheel)
+            kept.done('kept')
+            self.assertEqual(len(wheel), 1)
+            now[0] += 5
+            wheel.advance()
+            self.assertTrue(late.finished)
+            self.assertFalse(late.succeeded)
+            self.assertIsInstance(late.exception, PromiseTimeout)
+            self.assertEqual(errors, [late.exception])
+            self.assertEqual(late.exception.seconds, 5)
+            self.assertTrue(kept.succeeded)
+            self.assertEqual(len(wheel), 0)
+
+    def test_timeout_default(self):
+        promise = Promise().timeout(0.05)
+        finished = []
+        promise.complete(lambda evt: finished.append(evt.source.exception))
+        for i in range(500):
+            if finished:
+                break
+            time.sleep(0.01)
+        self.assertIsInstance(finished[0], PromiseTimeout)
+
+    def test_cancel(self):
+        for cls in (Promise, FastPromise):
+            promise = cls()
+            calls = []
+            promise.on_cancel(lambda evt: calls.append(evt.name))
+            promise.failure(lambda evt: calls.append(evt.name))
+            promise.error(lambda evt: calls.append(evt.data))
+            self.assertTrue(promise.cancel())
+            self.assertFalse(promise.cancel())
+            self.assertTrue(promise.cancelled)
+            self.assertEqual(calls[:2], ['cancel', 'failure'])
+            self.assertIsInstance(calls[2], PromiseCancelled)
+
+            done = cls()
+            done.done()
+            self.assertFalse(done.cancel())
+            self.assertFalse(done.cancelled)
+
+    def test_any_cancel_losers(self):
+        for cls in (Promise, FastPromise):
+            winner = cls()
+            loser = cls()
+            aborted = []
+            loser.on_cancel(lambda evt: aborted.append(evt.source))
+            hedged = cls.any(winner, loser, cancel_losers=True)
+            winner.done('winner')
+            self.assertEqual(hedged.value, 'winner')
+            self.assertEqual(aborted, [loser])
+            self.assertIsInstance(loser.exception, PromiseCancelled)
+
+            winner = cls()
+            kept = cls()
+            plain = cls.any(winner, kept)
+            winner.done('winner')
+            self.assertEqual(plain.value, 'winner')
+            self.assertFalse(kept.cancelled)
+
+    def test_unhook(self):
+        winner = FastPromise()
+        loser = FastPromise()
+        calls = []
+        loser.complete(lambda evt: calls.append('loser'))
+        Promise.any(winner, loser)
+        winner.done()
+        self.assertEqual(len(loser._on_complete), 1)
+
+        winner = Promise()
+        loser = Promise()
+        Promise.any(winner, loser)
+        winner.done()
+        self.assertFalse(loser.has_listeners('complete'))
+
+    def test_race(self):
+        first = Promise()
+        second = FastPromise()
+        raced = Promise.race(first, second)
+        err = ValueError()
+        first.throw(err)
+        self.assertIs(raced.exception, err)
+        self.assertTrue(second.cancelled)
+
+        first = FastPromise()
+        second = FastPromise()
+        raced = FastPromise.race(first, second)
+        self.assertTrue(raced.cancel())
+        self.assertTrue(first.cancelled)
+        self.assertTrue(second.cancelled)
+        self.assertIsInstance(raced.exception, PromiseCancelled)
+
+        done = FastPromise()
+        done.done('done')
+        pending = FastPromise()
+        self.assertEqual(FastPromise.race(done, pending).value, 'done')
+        self.assertTrue(pending.cancelled)
+
+    def test_progress(self):
+        for cls in (Promise, FastPromise):
+            promise = cls()
+            values = []
+            promise.progress(lambda evt: values.append(evt.data))
+            promise.notify(1)
+            promise.notify(2)
+            promise.done()
+            promise.notify(3)
+            self.assertEqual(values, [1, 2])
+
+    def test_progress_throttle(self):
+        now = [0.0]
+        wheel = TimerWheel(tick=0.1, clock=lambda: now[0])
+        for cls in (Promise, FastPromise):
+            promise = cls()
+            values = []
+            unthrottled = []
+
+            @promise.progress(interval=1, wheel=wheel)
+            def progress(evt):
+                self.assertIs(evt.source, promise)
+                values.append(evt.data)
+
+            promise.progress(lambda evt: unthrottled.append(evt.data))
+            promise.complete(lambda evt: values.append('complete'))
+            for value in range(100):
+                promise.notify(value)
+            self.assertEqual(values, [0])
+            self.assertEqual(unthrottled, range(100))
+            now[0] += 1
+            wheel.advance()
+            self.assertEqual(values, [0, 99])
+            now[0] += 0.5
+            wheel.advance()
+            promise.notify(100)
+            promise.notify(101)
+            self.assertEqual(values, [0, 99])
+            promise.done()
+            self.assertEqual(values, [0, 99, 101, 'complete'])
+            self.assertEqual(len(wheel), 0)
+
+
+class TestFastPromise(unittest.TestCase):
+    def test_outcomes(self):
+        promise = FastPromise()
+        calls = []
+
+        @promise.success
+        def success(evt):
+            calls.append(('success', evt.data))
+
+        promise.failure(lambda evt: calls.append(('failure', evt.data)))
+        promise.error(lambda evt: calls.append(('error', evt.data)))
+        promise.complete(lambda evt: calls.append(('complete', evt.data)))
+        promise.complete(lambda evt: calls.append(('complete2', evt.source)))
+        err = ValueError()
+        promise.done('data', success=False, err=err)
+        promise.done('again')
+        self.assertEqual(calls, [('failure', 'data'), ('error', err),
+                                 ('complete', 'data'),
+                                 ('complete2', promise)])
+        self.assertIs(promise.exception, err)
+
+    def test_late_subscribers(self):
+        promise = FastPromise()
+        promise.done('data')
+        calls = []
+        promise.success(lambda evt: calls.append(evt.data))
+        promise.failure(lambda evt: calls.append('failure'))
+        promise.error(lambda evt: calls.append('error'))
+        promise.complete(lambda evt: calls.append(evt.name))
+        self.assertEqual(calls, ['data', 'complete'])
+
+    def test_errors(self):
+        promise = FastPromise()
+        calls = []
+
+        def broken(evt):
+            raise KeyError()
+
+        promise.success(broken)
+        promise.complete(lambda evt: calls.append('complete'))
+        self.assertRaises(KeyError, promise.done)
+        self.assertEqual(calls, ['complete'])
+        self.assertTrue(promise.finished)
+        self.assertRaises(KeyError, promise.success, broken)
+
+    def test_all_any(self):
+        first = FastPromise()
+        second = Promise()
+        combined = FastPromise.all(first, second)
+        raced = FastPromise.any(first, second)
+        self.assertIsInstance(combined, FastPromise)
+        self.assertEqual(combined.waiting_for, (first, second))
+        second.done(2)
+        self.assertEqual(raced.value, 2)
+        self.assertFalse(combined.finished)
+        first.done(1)
+        self.assertEqual(combined.value, [1, 2])
+
+    def test_then(self):
+        promise = FastPromise()
+        chained = promise
+        for i in range(10000):
+            chained = chained.then(lambda data: data + 1)
+        promise.done(0)
+        self.assertIsInstance(chained, FastPromise)
+        self.assertEqual(chained.value, 10000)